@@ -0,0 +1,246 @@
+# ai/catalog_manager.py
+# Owns the live MealCatalog: local snapshot for fast cold starts,
+# Firestore as the source of truth
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import datetime, timezone
+
+from ai.meal_catalog import MealCatalog
+
+
+def catalog_version(meals):
+    """
+    Content hash of a meal list, independent of document order
+    """
+    canonical = sorted(
+        json.dumps(m, sort_keys=True, ensure_ascii=False, default=str)
+        for m in meals
+    )
+    return hashlib.sha1("\n".join(canonical).encode("utf-8")).hexdigest()[:16]
+
+
+# -------------------------------
+# Local snapshot files
+# -------------------------------
+def load_snapshot(path):
+    """
+    Returns (meals, version). Accepts a .pkl snapshot written by
+    save_snapshot, a {"version", "meals"} JSON snapshot, or a plain
+    JSON list such as meal_dataset.json.
+    """
+    if path.endswith(".pkl"):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    if isinstance(data, list):
+        return data, catalog_version(data)
+    return data["meals"], data.get("version") or catalog_version(data["meals"])
+
+
+def save_snapshot(path, meals, version):
+    data = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "meals": meals
+    }
+
+    # Write-then-rename, so a concurrent reader never sees half a file
+    tmp_path = f"{path}.tmp"
+    if path.endswith(".pkl"):
+        with open(tmp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+
+# -------------------------------
+# Catalog manager
+# -------------------------------
+class CatalogManager:
+    """
+    Holds the current MealCatalog and swaps in a new one (never
+    mutates it), so a request that grabbed .current keeps reading
+    one consistent version.
+
+    start() serves from the local snapshot when there is one and
+    checks it against Firestore in the background. A fresh
+    container has no snapshot yet (it is written at runtime), so
+    seed_path, a read-only catalog shipped with the code, stands in
+    for it. Without either, the catalog is streamed from Firestore
+    in the background and the process reports not-ready until it
+    lands.
+
+    With live=True the Firestore side is an on_snapshot listener on
+    the meals collection: adds / updates / deletes are applied to a
+    doc-id keyed map and, after debounce_seconds of quiet, a new
+    catalog (and its derived indexes) is built and swapped in.
+    """
+
+    def __init__(self, db, snapshot_path=None, live=False, debounce_seconds=1.0,
+                 seed_path=None):
+        self.db = db
+        self.snapshot_path = snapshot_path
+        self.seed_path = seed_path
+        self.live = live
+        self.debounce_seconds = debounce_seconds
+
+        self.current = None
+        self.version = None
+        self.source = None
+        self.fresh = False
+        self.ready_ms = None
+        self.error = None
+
+        self._ready = threading.Event()
+        self._started = None
+        self._on_swap = []
+
+        # Live mode state
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._watch = None
+
+        # Every listener delivery bumps the generation; rebuilds run
+        # one at a time and drop any older than the last one applied
+        self._generation = 0
+        self._applied_generation = 0
+        self._rebuild_lock = threading.Lock()
+
+    def on_swap(self, callback):
+        """
+        callback(catalog) runs after every catalog swap
+        """
+        self._on_swap.append(callback)
+
+    def _swap(self, meals, version, source):
+        catalog = MealCatalog(meals)
+        self.current = catalog
+        self.version = version
+        self.source = source
+
+        for callback in self._on_swap:
+            callback(catalog)
+
+        if not self._ready.is_set():
+            self.ready_ms = (time.perf_counter() - self._started) * 1000
+            self._ready.set()
+
+    def _stream_firestore(self):
+        return [d.to_dict() for d in self.db.collection("meals").stream()]
+
+    def _apply_firestore(self, meals):
+        version = catalog_version(meals)
+
+        if version != self.version:
+            self._swap(meals, version, "firestore")
+            if self.snapshot_path:
+                save_snapshot(self.snapshot_path, meals, version)
+            print(f"🔄 Catalog refreshed from Firestore: {len(meals)} meals (v{version})")
+
+        self.fresh = True
+
+    def _refresh_from_firestore(self):
+        try:
+            self._apply_firestore(self._stream_firestore())
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ Catalog Firestore check failed: {e}")
+
+    # -------------------------------
+    # Live mode (on_snapshot)
+    # -------------------------------
+    def _on_meals_snapshot(self, docs, changes, read_time):
+        with self._lock:
+            self._generation += 1
+            for change in changes:
+                doc_id = change.document.id
+                if change.type.name == "REMOVED":
+                    self._docs.pop(doc_id, None)
+                else:
+                    self._docs[doc_id] = change.document.to_dict()
+
+            # Coalesce bursts (e.g. upload_meals.py) into one rebuild;
+            # the initial listener delivery is not delayed
+            if self._timer is not None:
+                self._timer.cancel()
+            delay = self.debounce_seconds if self.fresh else 0
+            self._timer = threading.Timer(delay, self._rebuild_from_docs)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _rebuild_from_docs(self):
+        with self._lock:
+            meals = list(self._docs.values())
+            generation = self._generation
+            self._timer = None
+
+        with self._rebuild_lock:
+            # A timer that fired later already applied newer docs
+            if generation <= self._applied_generation:
+                return
+            try:
+                self._apply_firestore(meals)
+                self._applied_generation = generation
+            except Exception as e:
+                self.error = str(e)
+                print(f"❌ Catalog rebuild failed: {e}")
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def start(self):
+        self._started = time.perf_counter()
+
+        for path, source in ((self.snapshot_path, "snapshot"), (self.seed_path, "seed")):
+            if path and os.path.exists(path):
+                meals, version = load_snapshot(path)
+                self._swap(meals, version, source)
+                print(f"✅ Catalog loaded from {source}: {len(meals)} meals (v{version}) "
+                      f"in {self.ready_ms:.1f} ms")
+                break
+
+        if self.live:
+            self._watch = self.db.collection("meals").on_snapshot(self._on_meals_snapshot)
+            return
+
+        threading.Thread(
+            target=self._refresh_from_firestore,
+            name="catalog-refresh",
+            daemon=True
+        ).start()
+
+    def wait(self, timeout=None):
+        """
+        The current catalog, waiting up to timeout seconds for the
+        first load; None if it is still not there
+        """
+        self._ready.wait(timeout)
+        return self.current
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def status(self):
+        return {
+            "ready": self.is_ready(),
+            "source": self.source,
+            "version": self.version,
+            "fresh": self.fresh,
+            "live": self.live,
+            "meals": len(self.current) if self.current else 0,
+            "readyMs": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            "error": self.error
+        }
@@ -0,0 +1,120 @@
+# ai/consumption_rollups.py
+# Per-user, per-day consumption totals kept next to meal_logs
+
+import math
+
+from firebase_admin import firestore
+
+ROLLUP_COLLECTION = "daily_consumption"
+MACROS = ("calories", "protein", "carbs", "fat")
+
+
+def rollup_id(user_id, day):
+    return f"{user_id}_{day}"
+
+
+def rollup_ref(db, user_id, day):
+    return db.collection(ROLLUP_COLLECTION).document(rollup_id(user_id, day))
+
+
+def parse_macro(value):
+    """
+    A macro value as a number: None stays None, finite numbers and
+    numeric strings ("200", "12.5") are accepted, anything else
+    raises ValueError
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"not a number: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (float, str)):
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"not a finite number: {value!r}")
+        if isinstance(value, float):
+            return value
+        return int(number) if number.is_integer() else number
+    raise ValueError(f"not a number: {value!r}")
+
+
+def _as_number(value):
+    # Logs written before macros were validated may hold strings
+    try:
+        return parse_macro(value) or 0
+    except ValueError:
+        return 0
+
+
+def macro_totals(items):
+    """
+    Sums calories/protein/carbs/fat over log-shaped dicts
+    (missing, null or non-numeric values count as 0)
+    """
+    totals = {m: 0 for m in MACROS}
+    for item in items:
+        for m in MACROS:
+            totals[m] += _as_number(item.get(m))
+    return totals
+
+
+def macro_delta(new, old):
+    return {m: _as_number(new.get(m)) - _as_number(old.get(m)) for m in MACROS}
+
+
+def day_logs_query(db, user_id, day):
+    return db.collection("meal_logs") \
+             .where("userId", "==", user_id) \
+             .where("date", "==", day)
+
+
+def read_rollup_base(db, user_id, day, transaction=None):
+    """
+    Read half of a rollup update. Returns None when the rollup
+    already exists (it will be bumped with server-side increments),
+    otherwise seed totals from the day's already committed logs, so
+    days that started before rollups existed stay correct.
+
+    Inside a transaction, call this for every day before any write.
+    """
+    snapshot = rollup_ref(db, user_id, day).get(transaction=transaction)
+    if snapshot.exists:
+        return None
+
+    existing = [
+        d.to_dict()
+        for d in day_logs_query(db, user_id, day).stream(transaction=transaction)
+    ]
+    return {**macro_totals(existing), "logCount": len(existing)}
+
+
+def write_rollup(db, user_id, day, deltas, log_delta=0, base=None, writer=None):
+    """
+    Write half of a rollup update. writer may be a WriteBatch /
+    Transaction so the rollup commits atomically with the meal_logs
+    write; otherwise the document is set directly.
+    """
+    if base is None:
+        data = {
+            **{m: firestore.Increment(deltas.get(m) or 0) for m in MACROS},
+            "logCount": firestore.Increment(log_delta)
+        }
+    else:
+        data = {
+            **{m: base[m] + (deltas.get(m) or 0) for m in MACROS},
+            "logCount": base["logCount"] + log_delta
+        }
+
+    data.update({
+        "userId": user_id,
+        "date": day,
+        "updated_at": firestore.SERVER_TIMESTAMP
+    })
+
+    ref = rollup_ref(db, user_id, day)
+    if writer is not None:
+        writer.set(ref, data, merge=True)
+    else:
+        ref.set(data, merge=True)
+
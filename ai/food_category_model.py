@@ -1,7 +1,66 @@
 # ai/food_category_model.py
+import threading
+from collections import OrderedDict
+
 import joblib
 
+from ai.food_entity_extractor import FOOD_VOCAB
+
 model = joblib.load("models/food_category_classifier.joblib")
 
+# Bounded LRU memo of word -> category
+CACHE_SIZE = 4096
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def _remember(words, categories):
+    with _cache_lock:
+        for word, category in zip(words, categories):
+            _cache[word] = category
+            _cache.move_to_end(word)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def predict_categories(food_words):
+    """
+    Categories for many words: cached ones from the memo, all
+    misses with one predict call
+    """
+    if not food_words:
+        return []
+
+    found = {}
+    with _cache_lock:
+        for word in food_words:
+            if word in _cache:
+                _cache.move_to_end(word)
+                found[word] = _cache[word]
+
+    misses = [w for w in dict.fromkeys(food_words) if w not in found]
+    with _cache_lock:
+        cache_stats["hits"] += len(food_words) - len(misses)
+        cache_stats["misses"] += len(misses)
+
+    if misses:
+        predicted = model.predict(misses).tolist()
+        _remember(misses, predicted)
+        found.update(zip(misses, predicted))
+
+    return [found[w] for w in food_words]
+
+
 def predict_category(food_word):
-    return model.predict([food_word])[0]
+    return predict_categories([food_word])[0]
+
+
+# Precompute the rule-based vocabulary once at load time
+_known_words = list(dict.fromkeys(
+    word
+    for canonical, variants in FOOD_VOCAB.items()
+    for word in [canonical] + variants
+))
+_remember(_known_words, model.predict(_known_words).tolist())
@@ -1,6 +1,7 @@
 # ai/food_entity_extractor.py
 
 import re
+from collections import namedtuple
 
 FOOD_VOCAB = {
     "roti": ["roti", "rotis", "chapati", "phulka"],
@@ -12,14 +13,139 @@ FOOD_VOCAB = {
     "sabzi": ["sabzi", "vegetable", "bhaji"],
 }
 
-def extract_food_entities(text):
-    text = text.lower()
-    found = []
+# Catalog names / keywords shorter than this are too ambiguous to extract
+MIN_TERM_LENGTH = 3
 
-    for canonical, variants in FOOD_VOCAB.items():
-        for v in variants:
-            if re.search(rf"\b{v}\b", text):
-                found.append(canonical)
-                break
+# Catalog terms that are also ordinary English (mostly brand names);
+# the full names ("good day butter cookies") are still extracted
+AMBIGUOUS_TERMS = frozenset({
+    "good day", "hide and seek", "dark fantasy", "jim jam", "munch",
+    "treat", "nice"
+})
 
-    return list(set(found))
+_WORD = re.compile(r"\w+")
+_END = None   # trie key marking a complete term
+
+# A standalone count right before a food: "2 rotis", "1.5 cups".
+# Digits glued to something else ("2-3", "v2", "1/2") are not a count.
+_QUANTITY_BEFORE = re.compile(r"(?<![\w.\-/])(\d+(?:\.\d+)?)\s*$")
+
+# start / end are offsets into the original text
+EntitySpan = namedtuple("EntitySpan", ["start", "end", "text", "entity"])
+
+
+def _words(text):
+    return [w.lower() for w in _WORD.findall(text)]
+
+
+class FoodEntityExtractor:
+    """
+    Dictionary extractor over a word-level trie: the text is scanned
+    once, left to right, taking the longest known term at each word.
+    Cost depends on the text, not on how many terms are known.
+
+    Terms are the FOOD_VOCAB variants (entity = canonical key) plus,
+    with meals, catalog mealNames and multi-word searchKeywords
+    (entity = the normalized term itself). Single-word keywords
+    ("jam", "soda", "bakery") and AMBIGUOUS_TERMS are left out: they
+    turn up in sentences that are not about food. FOOD_VOCAB wins
+    where both define the same term.
+    """
+
+    def __init__(self, vocab=FOOD_VOCAB, meals=()):
+        self._trie = {}
+        self.size = 0
+
+        for meal in meals:
+            for term in self._catalog_terms(meal):
+                self._add(term, " ".join(term))
+
+        for canonical, variants in vocab.items():
+            for variant in variants:
+                self._add(_words(variant), canonical)
+
+    @staticmethod
+    def _catalog_terms(meal):
+        name = meal.get("mealName")
+        candidates = [(name, True)] + [
+            (keyword, False) for keyword in meal.get("searchKeywords") or []
+        ]
+
+        for term, is_name in candidates:
+            if not term or len(term.strip()) < MIN_TERM_LENGTH:
+                continue
+            words = _words(term)
+            if not words or " ".join(words) in AMBIGUOUS_TERMS:
+                continue
+            if len(words) > 1 or is_name:
+                yield words
+
+    def _add(self, words, entity):
+        if not words:
+            return
+
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+
+        if _END not in node:
+            self.size += 1
+        node[_END] = entity
+
+    def extract_spans(self, text):
+        """
+        Non-overlapping EntitySpans, leftmost-longest, in text order
+        """
+        words = list(_WORD.finditer(text))
+        spans = []
+
+        i = 0
+        while i < len(words):
+            node, match = self._trie, None
+
+            for j in range(i, len(words)):
+                node = node.get(words[j].group().lower())
+                if node is None:
+                    break
+                if _END in node:
+                    match = (j, node[_END])
+
+            if match is None:
+                i += 1
+                continue
+
+            j, entity = match
+            start, end = words[i].start(), words[j].end()
+            spans.append(EntitySpan(start, end, text[start:end], entity))
+            i = j + 1
+
+        return spans
+
+    def extract(self, text):
+        """
+        Distinct entities, in order of first mention
+        """
+        return list(dict.fromkeys(span.entity for span in self.extract_spans(text)))
+
+
+def quantity_before(text, end):
+    """
+    The count written right before text[end:] (int, or float for
+    decimals), or None when there is no clean standalone number
+    """
+    match = _QUANTITY_BEFORE.search(text, 0, end)
+    if match is None:
+        return None
+    value = float(match.group(1))
+    return int(value) if value.is_integer() else value
+
+
+_default_extractor = FoodEntityExtractor()
+
+
+def extract_food_entity_spans(text, extractor=None):
+    return (extractor or _default_extractor).extract_spans(text)
+
+
+def extract_food_entities(text, extractor=None):
+    return (extractor or _default_extractor).extract(text)
@@ -0,0 +1,153 @@
+# ai/fuzzy_matcher.py
+# Pre-indexed fuzzy meal matcher (rapidfuzz partial_ratio)
+
+from functools import lru_cache
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+@lru_cache(maxsize=None)
+def _bigram_filter_is_exact(length, threshold):
+    """
+    True if partial_ratio >= threshold forces the shorter string
+    (of this length) to share a character bigram with the other.
+
+    partial_ratio aligns the shorter string (length L) with a window
+    of length W <= L. Without a shared bigram, no two consecutive
+    matched characters are adjacent in both strings, so the longest
+    common subsequence k is at most (L + W + 1) // 3.
+    """
+    for window in range(1, length + 1):
+        k = min(window, (length + window + 1) // 3)
+        if 200.0 * k / (length + window) >= threshold:
+            return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _max_unsafe_length(threshold, limit=64):
+    unsafe = [
+        length for length in range(1, limit + 1)
+        if not _bigram_filter_is_exact(length, threshold)
+    ]
+    return max(unsafe, default=0)
+
+
+class FuzzyMealMatcher:
+    """
+    Built once from the catalog. Holds a flat, deduplicated array of
+    lowercased meal names / searchKeywords with a back-pointer to the
+    meal, and a bigram index used to shortlist candidates before
+    scoring them in one rapidfuzz call.
+    """
+
+    def __init__(self, meals):
+        names = []
+        owners = []
+        seen = set()
+
+        for meal in meals:
+            for name in [meal["mealName"]] + meal.get("searchKeywords", []):
+                name = name.lower()
+                if name in seen:
+                    continue
+                seen.add(name)
+                names.append(name)
+                owners.append(meal)
+
+        self.names = names
+        self.owners = owners
+
+        postings = {}
+        short = []
+        for i, name in enumerate(names):
+            grams = _bigrams(name)
+            if not grams:
+                short.append(i)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+
+        self._postings = {
+            g: np.array(idx, dtype=np.int32) for g, idx in postings.items()
+        }
+        self._lengths = np.array([len(n) for n in names], dtype=np.int32)
+        self._short = np.array(short, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _shortlist(self, query, threshold):
+        """
+        Indices (in catalog order) of names that can still reach
+        threshold, or None when the prefilter is not safe to apply.
+        """
+        if not _bigram_filter_is_exact(len(query), threshold):
+            return None
+
+        hits = [self._postings[g] for g in _bigrams(query) if g in self._postings]
+
+        # Names too short for the bigram argument always stay in
+        max_unsafe = _max_unsafe_length(threshold)
+        if max_unsafe:
+            hits.append(np.flatnonzero(self._lengths <= max_unsafe).astype(np.int32))
+        hits.append(self._short)
+
+        return np.unique(np.concatenate(hits))
+
+    def match(self, query, threshold=80):
+        """
+        Returns (meal, score in 0..1) for the best scoring name,
+        or (None, 0.0) when nothing reaches threshold.
+        Ties resolve to the earliest name, like the linear scan.
+        """
+        query = query.lower()
+        shortlist = self._shortlist(query, threshold)
+
+        if shortlist is None:
+            choices = self.names
+        else:
+            choices = [self.names[i] for i in shortlist]
+
+        best = process.extractOne(
+            query, choices,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=threshold
+        )
+
+        if best is None:
+            return None, 0.0
+
+        _, score, pos = best
+        idx = pos if shortlist is None else shortlist[pos]
+        return self.owners[idx], score / 100.0
+
+    def match_many(self, queries, threshold=80):
+        """
+        Batched match: one cdist call scores every query against
+        every name. Returns a list of (meal, score) pairs.
+        """
+        if not queries:
+            return []
+
+        queries = [q.lower() for q in queries]
+        scores = process.cdist(
+            queries, self.names,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=threshold,
+            dtype=np.float64,
+            workers=-1
+        )
+
+        results = []
+        for row in scores:
+            idx = int(np.argmax(row))
+            if row[idx] >= threshold and row[idx] > 0:
+                results.append((self.owners[idx], float(row[idx]) / 100.0))
+            else:
+                results.append((None, 0.0))
+        return results
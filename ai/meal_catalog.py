@@ -0,0 +1,128 @@
+# ai/meal_catalog.py
+# In-memory meal catalog with restriction-aware meal type buckets
+
+from ai.food_entity_extractor import FoodEntityExtractor
+from ai.fuzzy_matcher import FuzzyMealMatcher
+
+# -------------------------------
+# Restriction bitmask
+# -------------------------------
+VEGETARIAN = 1
+VEGAN = 2
+GLUTEN_FREE = 4
+NUT_FREE = 8
+LOW_GI = 16          # glycemic_index is "Low" or "Medium"
+
+ALL_FLAGS = VEGETARIAN | VEGAN | GLUTEN_FREE | NUT_FREE | LOW_GI
+
+DIABETES_SAFE_GI = ("Low", "Medium")
+
+
+def meal_mask(meal):
+    """
+    Bitmask of the restriction flags a meal satisfies
+    """
+    mask = 0
+    if meal.get("is_vegetarian") is True:
+        mask |= VEGETARIAN
+    if meal.get("is_vegan") is True:
+        mask |= VEGAN
+    if meal.get("is_gluten_free") is True:
+        mask |= GLUTEN_FREE
+    if meal.get("is_nut_free") is True:
+        mask |= NUT_FREE
+    if meal.get("glycemic_index") in DIABETES_SAFE_GI:
+        mask |= LOW_GI
+    return mask
+
+
+def normalize_name(name):
+    return " ".join(name.split()).lower()
+
+
+def required_mask(restrictions=None, health=None):
+    """
+    Bitmask a meal must satisfy for a user's
+    dietary_restrictions / health_conditions
+    """
+    restrictions = restrictions or {}
+    health = health or {}
+
+    mask = 0
+    if restrictions.get("vegetarian"):
+        mask |= VEGETARIAN
+    if restrictions.get("vegan"):
+        mask |= VEGAN
+    if restrictions.get("gluten_free"):
+        mask |= GLUTEN_FREE
+    if restrictions.get("nut_allergy"):
+        mask |= NUT_FREE
+    if health.get("diabetes"):
+        mask |= LOW_GI
+    return mask
+
+
+# -------------------------------
+# Catalog index
+# -------------------------------
+class MealCatalog:
+    """
+    Immutable view over the meals collection.
+
+    Meals are bucketed by validMealTypes and every possible
+    required restriction mask, so a candidate lookup is a dict
+    hit instead of a Firestore query. Also owns the fuzzy
+    name matcher and the food entity extractor built from the
+    same meals.
+    """
+
+    def __init__(self, meals, source="ai"):
+        self.meals = list(meals)
+        self.masks = [meal_mask(m) for m in self.meals]
+        self.matcher = FuzzyMealMatcher(self.meals)
+        self.extractor = FoodEntityExtractor(meals=self.meals)
+
+        # First meal wins on duplicate names, like .limit(1)
+        self.by_name = {}
+        for m in self.meals:
+            if m.get("mealName"):
+                self.by_name.setdefault(normalize_name(m["mealName"]), m)
+
+        # Bucket entries are tagged copies, so callers can
+        # hand them straight to the generator / jsonify
+        tagged = [dict(m, source=source) for m in self.meals]
+
+        by_type = {}
+        for meal, mask in zip(tagged, self.masks):
+            for meal_type in meal.get("validMealTypes", []):
+                by_type.setdefault(meal_type, []).append((mask, meal))
+
+        self._buckets = {}
+        for meal_type, entries in by_type.items():
+            for required in range(ALL_FLAGS + 1):
+                self._buckets[(meal_type, required)] = tuple(
+                    meal for mask, meal in entries
+                    if mask & required == required
+                )
+
+    def __len__(self):
+        return len(self.meals)
+
+    def get_by_name(self, name):
+        """
+        Case / whitespace-insensitive meal lookup, None on a miss
+        """
+        if not name:
+            return None
+        return self.by_name.get(normalize_name(name))
+
+    def meal_types(self):
+        return sorted({meal_type for meal_type, _ in self._buckets})
+
+    def candidates(self, meal_type, restrictions=None, health=None):
+        """
+        Meals valid for meal_type that satisfy the user's
+        restrictions. Returns a fresh list (safe to shuffle).
+        """
+        required = required_mask(restrictions, health)
+        return list(self._buckets.get((meal_type, required), ()))
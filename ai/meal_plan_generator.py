@@ -1,4 +1,7 @@
-import random
+import time
+from collections import deque
+
+import numpy as np
 
 MEAL_SPLIT = {
     "Breakfast": 0.25,
@@ -7,50 +10,304 @@ MEAL_SPLIT = {
     "Snack": 0.10
 }
 
-def build_meal(meal_type, foods, daily_calories):
+NUTRIENT_COLS = ["calories", "protein", "carbs", "fat"]
+
+# Relative weight of each nutrient's deviation from its slot target
+MACRO_WEIGHTS = np.array([1.0, 0.6, 0.4, 0.4])
+
+MAX_ITEMS = 4
+MAX_PER_CATEGORY = 2
+TIME_BUDGET_MS = 20
+MAX_RESTARTS = 8
+MAX_IMPROVE_STEPS = 50
+GREEDY_TOP_K = 3
+
+
+def nutrient_matrix(foods):
     """
-    Accumulates foods until meal calorie target is satisfied
+    (n_foods, 4) matrix of calories / protein / carbs / fat
     """
+    return np.array(
+        [[f.get(c) or 0 for c in NUTRIENT_COLS] for f in foods],
+        dtype=float
+    ).reshape(len(foods), len(NUTRIENT_COLS))
+
+
+def slot_goal(meal_type, target):
+    """
+    Nutrient targets for one MEAL_SPLIT slot of the daily target
+    """
+    split = MEAL_SPLIT.get(meal_type, 0)
+    return np.array([(target.get(c) or 0) * split for c in NUTRIENT_COLS], dtype=float)
+
+
+def _deviation(totals, goal, weights):
+    """
+    Weighted relative deviation of totals (..., 4) from goal
+    """
+    return (np.abs(totals - goal) / np.maximum(goal, 1.0)) @ weights
+
+
+class _SlotOptimizer:
+    """
+    Picks a subset of candidate foods whose summed nutrients are
+    closest to a slot goal. Randomized greedy construction followed
+    by swap / add / drop local search, restarted until the time
+    budget runs out. Every move is scored for all candidates at once.
+    Without a time budget the search is bounded by MAX_RESTARTS and
+    MAX_IMPROVE_STEPS only, so its result depends on the rng alone.
+    """
+
+    def __init__(self, matrix, goal, categories, weights, allowed,
+                 max_items, max_per_category):
+        self.matrix = matrix
+        self.goal = goal
+        self.weights = weights
+        self.allowed = allowed
+        self.max_items = max_items
+        self.max_per_category = max_per_category
+
+        _, self.categories = np.unique(categories, return_inverse=True)
+        self.n_categories = int(self.categories.max()) + 1 if len(categories) else 0
 
-    target_calories = daily_calories * MEAL_SPLIT[meal_type]
-    meal_items = []
-    meal_calories = 0
+    def cost(self, totals):
+        return float(_deviation(totals, self.goal, self.weights))
 
-    random.shuffle(foods)
+    def _open_mask(self, selected, dropped=None):
+        """
+        Candidates that may join the selection (optionally after
+        dropping one member)
+        """
+        mask = self.allowed.copy()
+        members = [i for i in selected if i != dropped]
+        mask[members] = False
 
-    for food in foods:
-        if meal_calories >= target_calories * 0.90:
-            break
+        if members:
+            counts = np.bincount(self.categories[members], minlength=self.n_categories)
+            mask &= counts[self.categories] < self.max_per_category
+        return mask
 
-        meal_items.append(food)
-        meal_calories += food.get("calories", 0)
+    def greedy(self, rng):
+        selected = []
+        totals = np.zeros(len(self.goal))
+        current = self.cost(totals)
+
+        while len(selected) < self.max_items:
+            mask = self._open_mask(selected)
+            if not mask.any():
+                break
+
+            costs = _deviation(totals + self.matrix, self.goal, self.weights)
+            costs[~mask] = np.inf
+
+            k = min(GREEDY_TOP_K, int(mask.sum()))
+            top = np.argpartition(costs, k - 1)[:k]
+            top = top[costs[top] < current]
+            if len(top) == 0:
+                break
+
+            pick = int(rng.choice(top))
+            selected.append(pick)
+            totals = totals + self.matrix[pick]
+            current = float(costs[pick])
+
+        return selected, totals, current
+
+    def improve(self, selected, totals, current, deadline=None):
+        for _ in range(MAX_IMPROVE_STEPS):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            best_cost, best_move = current, None
+
+            # Add one more item
+            if len(selected) < self.max_items:
+                mask = self._open_mask(selected)
+                if mask.any():
+                    costs = _deviation(totals + self.matrix, self.goal, self.weights)
+                    costs[~mask] = np.inf
+                    j = int(np.argmin(costs))
+                    if costs[j] < best_cost:
+                        best_cost, best_move = float(costs[j]), (None, j)
+
+            for pos, i in enumerate(selected):
+                without = totals - self.matrix[i]
+
+                # Drop it
+                if len(selected) > 1:
+                    c = self.cost(without)
+                    if c < best_cost:
+                        best_cost, best_move = c, (pos, None)
+
+                # Swap it for another candidate
+                mask = self._open_mask(selected, dropped=i)
+                if mask.any():
+                    costs = _deviation(without + self.matrix, self.goal, self.weights)
+                    costs[~mask] = np.inf
+                    j = int(np.argmin(costs))
+                    if costs[j] < best_cost:
+                        best_cost, best_move = float(costs[j]), (pos, j)
+
+            if best_move is None:
+                break
+
+            pos, j = best_move
+            if pos is not None:
+                totals = totals - self.matrix[selected[pos]]
+                selected = selected[:pos] + selected[pos + 1:]
+            if j is not None:
+                totals = totals + self.matrix[j]
+                selected = selected + [j]
+            current = best_cost
+
+        return selected, totals, current
+
+    def solve(self, rng, time_budget_ms=None):
+        deadline = None
+        if time_budget_ms is not None:
+            deadline = time.perf_counter() + time_budget_ms / 1000.0
+
+        best = ([], np.zeros(len(self.goal)), self.cost(np.zeros(len(self.goal))))
+        for _ in range(MAX_RESTARTS):
+            selected, totals, current = self.greedy(rng)
+            selected, totals, current = self.improve(selected, totals, current, deadline)
+
+            if current < best[2]:
+                best = (selected, totals, current)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        return best
+
+
+def build_meal(meal_type, foods, target, rng=None, exclude=None,
+               time_budget_ms=TIME_BUDGET_MS, weights=MACRO_WEIGHTS,
+               max_items=MAX_ITEMS, max_per_category=MAX_PER_CATEGORY):
+    """
+    Chooses foods for one meal slot so that calories / protein /
+    carbs / fat land as close as possible to the slot's share of the
+    daily target (weighted relative deviation).
+
+    target: daily target dict (calories, protein, carbs, fat)
+    exclude: meal names that must not be picked
+    time_budget_ms: None searches a fixed number of restarts
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    exclude = exclude or set()
+
+    goal = slot_goal(meal_type, target)
+    weights = np.where(goal > 0, weights, 0.0)
+
+    matrix = nutrient_matrix(foods)
+
+    # Excluded dishes, and repeated entries of the same dish, are off limits
+    seen = set(exclude)
+    allowed = np.zeros(len(foods), dtype=bool)
+    for i, f in enumerate(foods):
+        name = f.get("mealName")
+        allowed[i] = name not in seen
+        seen.add(name)
+    categories = np.array([str(f.get("category")) for f in foods])
+
+    selected, totals, deviation = [], np.zeros(len(NUTRIENT_COLS)), 0.0
+    if len(foods):
+        optimizer = _SlotOptimizer(
+            matrix, goal, categories, weights, allowed,
+            max_items, max_per_category
+        )
+        selected, totals, deviation = optimizer.solve(rng, time_budget_ms)
 
     return {
-        "items": meal_items,
-        "mealCalories": round(meal_calories, 1)
+        "items": [foods[i] for i in selected],
+        "mealCalories": round(float(totals[0]), 1),
+        "macros": {
+            c: round(float(v), 1) for c, v in zip(NUTRIENT_COLS, totals)
+        },
+        "deviation": round(float(deviation), 3)
     }
 
 
-def generate_full_meal_plan(target, meals_by_type):
+def _plan_day(target, meals_by_type, rng, time_budget_ms, exclude=None):
     """
-    meals_by_type = {
-        "Breakfast": [...],
-        "Lunch": [...],
-        "Dinner": [...],
-        "Snack": [...]
-    }
+    One day's plan. With exclude (a set of meal names), those dishes
+    and the ones already picked for earlier slots are avoided.
+    Returns (plan, names used).
     """
-
     plan = {}
     total_calories = 0
+    used = set()
 
     for meal_type, foods in meals_by_type.items():
         if not foods:
             continue
 
-        meal = build_meal(meal_type, foods, target["calories"])
+        avoid = exclude | used if exclude is not None else None
+        meal = build_meal(
+            meal_type, foods, target,
+            rng=rng, exclude=avoid, time_budget_ms=time_budget_ms
+        )
+
+        # Variety rules emptied the pool: repeat a dish rather than skip
+        if avoid and not meal["items"]:
+            meal = build_meal(
+                meal_type, foods, target,
+                rng=rng, time_budget_ms=time_budget_ms
+            )
+
+        used.update(item["mealName"] for item in meal["items"])
         plan[meal_type.lower()] = meal
         total_calories += meal["mealCalories"]
 
     plan["totalCalories"] = round(total_calories, 1)
+    return plan, used
+
+
+def generate_full_meal_plan(target, meals_by_type, seed=None,
+                            time_budget_ms=TIME_BUDGET_MS):
+    """
+    meals_by_type = {
+        "Breakfast": [...],
+        "Lunch": [...],
+        "Dinner": [...],
+        "Snack": [...]
+    }
+
+    seed makes the plan reproducible: the time budget is then
+    ignored and the search runs its fixed number of restarts
+    """
+    if seed is not None:
+        time_budget_ms = None
+
+    rng = np.random.default_rng(seed)
+    plan, _ = _plan_day(target, meals_by_type, rng, time_budget_ms)
     return plan
+
+
+def generate_multi_day_meal_plan(target, meals_by_type, days,
+                                 variety_window=3, seed=None,
+                                 time_budget_ms=TIME_BUDGET_MS):
+    """
+    Plans several consecutive days from the same candidate pools.
+    A dish is not repeated within a day, nor on any of the next
+    variety_window days.
+
+    Returns a list of day plans, same shape as generate_full_meal_plan
+    (and, like it, reproducible for a given seed)
+    """
+    if seed is not None:
+        time_budget_ms = None
+
+    rng = np.random.default_rng(seed)
+    recent = deque(maxlen=max(variety_window, 0))
+    plans = []
+
+    for _ in range(days):
+        exclude = set().union(*recent)
+        plan, used = _plan_day(
+            target, meals_by_type, rng, time_budget_ms, exclude=exclude
+        )
+        plans.append(plan)
+
+        if recent.maxlen:
+            recent.append(used)
+
+    return plans
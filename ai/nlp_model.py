@@ -1,47 +1,99 @@
 # ai/nlp_model.py
 
-import joblib
+import os
 import re
+import threading
+
+import joblib
 import numpy as np
 
-# Load trained NLP model ONCE
-MODEL_PATH = "models/nlp_meal_classifier.joblib"
-nlp_model = joblib.load(MODEL_PATH)
+MODEL_PATH = os.environ.get("NLP_MODEL_PATH", "models/nlp_meal_classifier.joblib")
+
+# Multi-meal input is split on "and" / ","; quantities are bare numbers
+SPLIT_PATTERN = re.compile(r"\band\b|,")
+QUANTITY_PATTERN = re.compile(r"\d+")
+
+# Candidates returned per part
+TOP_K = 3
 
-def extract_meals_from_text(text):
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_model():
     """
-    Extracts meal predictions + quantities from user text
+    The trained classifier, loaded once on first use;
+    None when MODEL_PATH does not exist
     """
-    text = text.lower()
+    global _model
+    if _model is None and os.path.exists(MODEL_PATH):
+        with _model_lock:
+            if _model is None:
+                _model = joblib.load(MODEL_PATH)
+    return _model
 
-    # Split sentence for multi-meal input
-    parts = re.split(r"and|,", text)
 
-    results = []
+def is_available():
+    return load_model() is not None
 
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
 
-        # Quantity extraction
-        qty_match = re.search(r"(\d+)", part)
-        quantity = int(qty_match.group(1)) if qty_match else 1
+def _split_parts(text):
+    """
+    (clean text, quantity) for every meal mentioned in text
+    """
+    parts = []
+    for part in SPLIT_PATTERN.split(text.lower()):
+        qty_match = QUANTITY_PATTERN.search(part)
+        quantity = int(qty_match.group()) if qty_match else 1
 
-        # Remove quantity from text
-        clean_text = re.sub(r"\d+", "", part).strip()
+        clean_text = QUANTITY_PATTERN.sub("", part).strip()
+        if clean_text:
+            parts.append((clean_text, quantity))
+    return parts
 
-        # Predict meal
-        probs = nlp_model.predict_proba([clean_text])[0]
-        pred_index = np.argmax(probs)
-        confidence = float(probs[pred_index])
 
-        meal_name = nlp_model.classes_[pred_index]
+def extract_meals_from_texts(texts, top_k=TOP_K):
+    """
+    extract_meals_from_text for many texts: every part of every
+    text is scored in a single predict_proba call.
+    Returns one result list per text.
+    """
+    model = load_model()
+    if model is None:
+        raise RuntimeError(f"NLP model not found at {MODEL_PATH}")
+
+    split = [_split_parts(text) for text in texts]
+    clean = [clean_text for parts in split for clean_text, _ in parts]
+    if not clean:
+        return [[] for _ in texts]
 
-        results.append({
-            "meal": meal_name,
-            "quantity": quantity,
-            "confidence": round(confidence, 3)
-        })
+    probs = model.predict_proba(clean)
+    top = np.argsort(-probs, axis=1, kind="stable")[:, :max(top_k, 1)]
+
+    results = []
+    row = 0
+    for parts in split:
+        items = []
+        for _, quantity in parts:
+            candidates = [
+                {"meal": str(model.classes_[j]), "confidence": round(float(probs[row, j]), 3)}
+                for j in top[row]
+            ]
+            items.append({
+                "meal": candidates[0]["meal"],
+                "quantity": quantity,
+                "confidence": candidates[0]["confidence"],
+                "candidates": candidates
+            })
+            row += 1
+        results.append(items)
 
     return results
+
+
+def extract_meals_from_text(text, top_k=TOP_K):
+    """
+    Extracts meal predictions + quantities from user text, with the
+    top_k candidate meals (and probabilities) for every part
+    """
+    return extract_meals_from_texts([text], top_k=top_k)[0]
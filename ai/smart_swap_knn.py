@@ -1,17 +1,124 @@
 # ai/smart_swap_knn.py
 
+import json
+import os
+import threading
+
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.neighbors import NearestNeighbors
 import joblib
 
+from ai.meal_catalog import meal_mask, required_mask
+
 FEATURE_COLS = ["calories", "protein", "carbs", "fat"]
 
+# Directory artifact layout (see SmartSwapKNN.save)
+ARTIFACT_FORMAT = "smartswap-knn"
+ARTIFACT_VERSION = 2
+# Version 1 has no scaled.npy; it is recomputed at load
+SUPPORTED_ARTIFACT_VERSIONS = (1, 2)
+
+
+def feature_matrix(meals):
+    return np.array(
+        [[m.get(c, 0) for c in FEATURE_COLS] for m in meals],
+        dtype=float
+    ).reshape(len(meals), len(FEATURE_COLS))
+
+
+# Neighbors kept per meal in the precomputed table
+TABLE_K = 10
+
+
+class _Partition:
+    """
+    k-NN index over the meals valid for one (meal type, required
+    restriction mask) pair. members maps local rows to global indices.
+
+    Also holds a precomputed neighbor table (top table_k + 1 local
+    neighbor indices / distances for every member, self included)
+    so catalog meals resolve with an array lookup.
+    """
+
+    def __init__(self, members, X_scaled, table_k, knn=None,
+                 table_idx=None, table_dist=None):
+        self.members = np.asarray(members, dtype=int)
+        self.local = np.full(len(X_scaled), -1, dtype=np.int32)
+        self.local[self.members] = np.arange(len(self.members), dtype=np.int32)
+
+        self.knn = knn
+        self.table_idx = np.empty((len(self.members), 0), dtype=np.int32)
+        self.table_dist = np.empty((len(self.members), 0), dtype=np.float32)
+
+        if not len(self.members):
+            return
+
+        if self.knn is None:
+            self.knn = NearestNeighbors(metric="euclidean")
+            self.knn.fit(X_scaled[self.members])
+
+        if table_idx is not None:
+            self.table_idx, self.table_dist = table_idx, table_dist
+        elif table_k:
+            dist, idx = self.knn.kneighbors(
+                X_scaled[self.members],
+                n_neighbors=min(table_k + 1, len(self.members))
+            )
+            self.table_idx = idx.astype(np.int32)
+            self.table_dist = dist.astype(np.float32)
+
+    def __len__(self):
+        return len(self.members)
+
+
 class SmartSwapKNN:
-    def __init__(self):
+    def __init__(self, table_k=TABLE_K):
         self.scaler = StandardScaler()
         self.knn = None
         self.meals = []   # full meal dicts
+        self.table_k = table_k
+
+        self._features = None
+        self._X_scaled = None
+        self._masks = []
+        self._row_by_name = {}
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+    def _index_meals(self, table_idx=None, table_dist=None, features=None,
+                     X_scaled=None):
+        """
+        Derived per-meal data used by the partitions; the global
+        partition wraps self.knn and the (saved) neighbor table
+        """
+        if features is None:
+            features = feature_matrix(self.meals).astype(np.float32)
+        self._features = features
+        self._X_scaled = X_scaled if X_scaled is not None else self.scaler.transform(features)
+        self._masks = [meal_mask(m) for m in self.meals]
+
+        self._row_by_name = {}
+        for i, m in enumerate(self.meals):
+            self._row_by_name.setdefault(m.get("mealName"), i)
+
+        if not self.table_k:
+            table_idx = table_dist = None
+
+        self._partitions = {
+            (None, 0): _Partition(
+                np.arange(len(self.meals)), self._X_scaled, self.table_k,
+                knn=self.knn, table_idx=table_idx, table_dist=table_dist
+            )
+        }
+
+    @property
+    def neighbor_table(self):
+        """
+        (indices int32, distances float32) of the global top-k table
+        """
+        part = self._partitions[(None, 0)]
+        return part.table_idx, part.table_dist
 
     def fit(self, meals):
         X = []
@@ -27,31 +134,246 @@ class SmartSwapKNN:
             metric="euclidean"
         )
         self.knn.fit(X_scaled)
+        self._index_meals()
+
+    def _partition(self, meal_type, required):
+        """
+        Partition index for a meal type (None = any) and required
+        restriction mask, built on first use and then reused
+        """
+        key = (meal_type, required)
+        part = self._partitions.get(key)
+        if part is not None:
+            return part
+
+        with self._lock:
+            part = self._partitions.get(key)
+            if part is None:
+                members = [
+                    i for i, (m, mask) in enumerate(zip(self.meals, self._masks))
+                    if mask & required == required
+                    and (meal_type is None or meal_type in m.get("validMealTypes", []))
+                ]
+                part = _Partition(members, self._X_scaled, self.table_k)
+                self._partitions[key] = part
+        return part
+
+    def _table_rows(self, part, meals, features, n_neighbors):
+        """
+        Local partition row for every meal the precomputed table can
+        answer (a catalog member with unchanged features), else -1
+        """
+        rows = np.full(len(meals), -1, dtype=np.int32)
+        if n_neighbors > part.table_idx.shape[1]:
+            return rows
+
+        for i, meal in enumerate(meals):
+            row = self._row_by_name.get(meal.get("mealName"))
+            if row is None or part.local[row] < 0:
+                continue
+            if np.array_equal(self._features[row], features[i].astype(np.float32)):
+                rows[i] = part.local[row]
+        return rows
+
+    def find_replacements(self, meal, k=5, meal_type=None,
+                          restrictions=None, health=None):
+        """
+        k nearest meals by calories / protein / carbs / fat.
+
+        meal_type, restrictions (dietary_restrictions) and health
+        (health_conditions) restrict suggestions to the matching
+        partition, so a swap is always valid for the user and slot.
+        """
+        return self.find_replacements_batch(
+            [meal], k=k, meal_type=meal_type,
+            restrictions=restrictions, health=health
+        )[0]
+
+    def find_replacements_batch(self, meals, k=5, meal_type=None,
+                                restrictions=None, health=None):
+        """
+        find_replacements for many meals at once. Catalog meals are
+        read from the precomputed neighbor table; any others share one
+        scaler.transform + kneighbors call over their stacked rows.
+        Returns one suggestion list per input meal.
+        """
+        if not meals:
+            return []
 
-    def find_replacements(self, meal, k=5):
-        x = np.array([[meal.get(c, 0) for c in FEATURE_COLS]])
-        x_scaled = self.scaler.transform(x)
+        features = feature_matrix(meals)
 
-        _, idxs = self.knn.kneighbors(x_scaled, n_neighbors=k+1)
+        required = required_mask(restrictions, health)
+        part = self._partition(meal_type, required)
+        if not len(part):
+            return [[] for _ in meals]
 
-        results = []
-        for idx in idxs[0]:
-            candidate = self.meals[idx]
-            if candidate["mealName"] != meal["mealName"]:
-                results.append(candidate)
-            if len(results) >= k:
-                break
-        return results
+        n_neighbors = min(k + 1, len(part))
+
+        # Catalog meals: direct lookup in the neighbor table
+        rows = self._table_rows(part, meals, features, n_neighbors)
+        idxs = np.empty((len(meals), n_neighbors), dtype=np.int64)
+        hits = rows >= 0
+        if hits.any():
+            idxs[hits] = part.table_idx[rows[hits], :n_neighbors]
+
+        # Everything else: one live kneighbors call
+        if not hits.all():
+            X_scaled = self.scaler.transform(features[~hits])
+            _, live = part.knn.kneighbors(X_scaled, n_neighbors=n_neighbors)
+            idxs[~hits] = live
+
+        idxs = part.members[idxs]
+
+        all_results = []
+        for meal, row in zip(meals, idxs):
+            results = []
+            for idx in row:
+                candidate = self.meals[idx]
+                if candidate["mealName"] != meal["mealName"]:
+                    results.append(candidate)
+                if len(results) >= k:
+                    break
+            all_results.append(results)
+        return all_results
 
     def save(self, path):
-        joblib.dump({
-            "scaler": self.scaler,
-            "knn": self.knn,
-            "meals": self.meals
-        }, path)
+        """
+        path ending in .joblib: legacy single pickle (scaler, knn and
+        full meal dicts). Anything else: versioned artifact directory
+
+            manifest.json       format, version, columns, meal ids
+            features.npy        float32 (n_meals, 4) raw features
+            scaled.npy          float64 (n_meals, 4) standardized features
+            scaler_mean.npy     float64 StandardScaler parameters
+            scaler_scale.npy
+            neighbor_idx.npy    int32 / float32 neighbor table
+            neighbor_dist.npy
+
+        Meal ids are mealNames resolved against the catalog at load
+        time. The arrays are memory-mapped and queried in place (the
+        global index is a brute-force search over scaled.npy), so
+        workers on one host share their pages through the OS page
+        cache. Per-partition indexes are still built per process.
+        """
+        table_idx, table_dist = self.neighbor_table
+
+        if path.endswith(".joblib"):
+            joblib.dump({
+                "scaler": self.scaler,
+                "knn": self.knn,
+                "meals": self.meals,
+                "neighbor_idx": table_idx,
+                "neighbor_dist": table_dist
+            }, path)
+            return
+
+        os.makedirs(path, exist_ok=True)
+
+        arrays = {
+            "features": np.asarray(self._features, dtype=np.float32),
+            "scaled": np.asarray(self._X_scaled, dtype=np.float64),
+            "scaler_mean": np.asarray(self.scaler.mean_, dtype=np.float64),
+            "scaler_scale": np.asarray(self.scaler.scale_, dtype=np.float64),
+            "neighbor_idx": np.asarray(table_idx, dtype=np.int32),
+            "neighbor_dist": np.asarray(table_dist, dtype=np.float32)
+        }
+        # Written aside and renamed over: processes that have the
+        # old files mapped keep reading the old inodes
+        for name, array in arrays.items():
+            target = os.path.join(path, f"{name}.npy")
+            with open(target + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(target + ".tmp", target)
+
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "version": ARTIFACT_VERSION,
+            "feature_cols": FEATURE_COLS,
+            "table_k": self.table_k,
+            "meal_ids": [m.get("mealName") for m in self.meals]
+        }
+        target = os.path.join(path, "manifest.json")
+        with open(target + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(target + ".tmp", target)
+
+    def load(self, path, lookup=None):
+        """
+        Loads an artifact directory, or a legacy .joblib file.
+
+        lookup(meal_name) -> meal dict resolves artifact meal ids
+        against the catalog; unknown ids get a stub with just the
+        name and features.
+        """
+        if os.path.isdir(path):
+            self._load_artifact(path, lookup)
+            return
 
-    def load(self, path):
         data = joblib.load(path)
         self.scaler = data["scaler"]
         self.knn = data["knn"]
         self.meals = data["meals"]
+
+        # Older files have no table: it is rebuilt from the index
+        table_idx = data.get("neighbor_idx")
+        if table_idx is not None and table_idx.shape[1] != min(self.table_k + 1, len(self.meals)):
+            table_idx = None
+        self._index_meals(
+            table_idx=table_idx,
+            table_dist=data.get("neighbor_dist") if table_idx is not None else None
+        )
+
+    def _load_artifact(self, path, lookup):
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if manifest.get("format") != ARTIFACT_FORMAT \
+                or manifest.get("version") not in SUPPORTED_ARTIFACT_VERSIONS:
+            raise ValueError(
+                f"Unsupported k-NN artifact: {manifest.get('format')} v{manifest.get('version')}"
+            )
+        if manifest.get("feature_cols") != FEATURE_COLS:
+            raise ValueError(f"k-NN artifact feature columns mismatch: {manifest.get('feature_cols')}")
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        features = array("features")
+
+        self.scaler = StandardScaler()
+        self.scaler.mean_ = np.array(array("scaler_mean"))
+        self.scaler.scale_ = np.array(array("scaler_scale"))
+        self.scaler.var_ = self.scaler.scale_ ** 2
+        self.scaler.n_features_in_ = len(FEATURE_COLS)
+        self.scaler.n_samples_seen_ = len(features)
+
+        self.meals = []
+        for meal_id, row in zip(manifest["meal_ids"], features):
+            meal = lookup(meal_id) if lookup else None
+            if meal is None:
+                meal = {"mealName": meal_id, **dict(zip(FEATURE_COLS, row.tolist()))}
+            self.meals.append(meal)
+
+        if manifest["version"] >= 2:
+            X_scaled = array("scaled")
+        else:
+            X_scaled = self.scaler.transform(features)
+
+        # Brute force keeps the mapped matrix as the index itself
+        # (a tree would copy it into private arrays)
+        self.knn = NearestNeighbors(
+            n_neighbors=6,
+            metric="euclidean",
+            algorithm="brute"
+        )
+        self.knn.fit(X_scaled)
+
+        table_idx = None
+        if manifest.get("table_k") == self.table_k:
+            table_idx = array("neighbor_idx")
+        self._index_meals(
+            table_idx=table_idx,
+            table_dist=array("neighbor_dist") if table_idx is not None else None,
+            features=features,
+            X_scaled=X_scaled
+        )
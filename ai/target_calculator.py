@@ -3,6 +3,8 @@
 
 from datetime import datetime, timedelta
 
+from ai.consumption_rollups import day_logs_query, rollup_ref
+
 # -------------------------------
 # BMR Calculation
 # -------------------------------
@@ -67,33 +69,49 @@ def compute_base_targets(profile):
 
 
 # -------------------------------
-# Calorie Banking (3-day window)
+# Calorie Banking (N-day window)
 # -------------------------------
-def apply_calorie_banking(user_id, base_targets, db):
+def apply_calorie_banking(user_id, base_targets, db, window_days=3):
+    """
+    Nudges today's calories by the average surplus/deficit of the
+    previous window_days days. Targets and consumption rollups for
+    the whole window come back from one batched get_all.
+    """
     today = datetime.now().date()
+    days = [str(today - timedelta(days=i)) for i in range(1, window_days + 1)]
+
+    target_refs = [
+        db.collection("daily_targets").document(f"{user_id}_{day}")
+        for day in days
+    ]
+    rollup_refs = [rollup_ref(db, user_id, day) for day in days]
+
+    snapshots = {
+        snap.reference.path: snap
+        for snap in db.get_all(target_refs + rollup_refs)
+    }
+
     total_deviation = 0
     days_counted = 0
 
-    for i in range(1, 4):
-        day = today - timedelta(days=i)
-
-        target_doc = db.collection("daily_targets").document(
-            f"{user_id}_{day}"
-        ).get()
+    for day, target_ref, day_rollup_ref in zip(days, target_refs, rollup_refs):
+        target_doc = snapshots.get(target_ref.path)
 
-        if not target_doc.exists:
+        if target_doc is None or not target_doc.exists:
             continue
 
         target = target_doc.to_dict().get("calories", 0)
 
-        logs = db.collection("meal_logs") \
-                 .where("userId", "==", user_id) \
-                 .stream()
-
-        consumed = sum(
-            log.to_dict().get("calories", 0)
-            for log in logs
-        )
+        rollup_doc = snapshots.get(day_rollup_ref.path)
+        if rollup_doc is not None and rollup_doc.exists:
+            consumed = rollup_doc.to_dict().get("calories", 0)
+        else:
+            # Days logged before rollups existed: scan that day only
+            logs = day_logs_query(db, user_id, day).stream()
+            consumed = sum(
+                log.to_dict().get("calories") or 0
+                for log in logs
+            )
 
         total_deviation += (consumed - target)
         days_counted += 1
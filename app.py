@@ -1,15 +1,41 @@
-from flask import Flask, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+import time
+STARTUP_BEGAN = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify
+from werkzeug.exceptions import ServiceUnavailable
 import firebase_admin
 from firebase_admin import credentials, firestore
+import hashlib
+import hmac
 import random
 from ai.target_calculator import compute_base_targets, apply_calorie_banking
 from ai.smart_swap_knn import SmartSwapKNN
-from ai.meal_plan_generator import generate_full_meal_plan
+from ai.meal_plan_generator import (
+    generate_full_meal_plan, generate_multi_day_meal_plan
+)
 import os
-from datetime import date
-from ai.food_entity_extractor import extract_food_entities
-from ai.food_category_model import predict_category
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from ai.food_entity_extractor import extract_food_entity_spans, quantity_before
+from ai.food_category_model import predict_categories
+from ai import nlp_model
+from ai.catalog_manager import CatalogManager
+from ai.consumption_rollups import (
+    MACROS, ROLLUP_COLLECTION, day_logs_query, macro_delta, macro_totals,
+    parse_macro, read_rollup_base, rollup_id, write_rollup
+)
+from firestore_reads import QuerySpec, ThreadedReads
+from data_access import DataAccess
+from password_hashing import PasswordHasher
+import metrics
+from metrics import inference_timer
+import profiling
+from profiling import RequestProfiler
+import payloads
+from payloads import (
+    COMPACT_LOG_FIELDS, COMPACT_MEAL_FIELDS, explanation_key, project,
+    project_plan, requested_fields
+)
 
 
 
@@ -38,38 +64,51 @@ CANONICAL_MEALS = {
 
 
 
-def extract_quantities(text, entities):
-    text = text.lower().split()
-    quantities = {e: 1 for e in entities}
+def extract_quantities(text, spans):
+    """
+    Quantity per normalized entity from its extracted spans;
+    defaults to 1 (also for ranges such as "2-3"), a later mention
+    with a count wins
+    """
+    quantities = {}
 
-    for i, token in enumerate(text):
-        if token.isdigit() and i + 1 < len(text):
-            next_word = text[i + 1]
-            for e in entities:
-                if e in next_word:
-                    quantities[e] = int(token)
+    for span in spans:
+        entity = normalize_entity(span.entity)
+        count = quantity_before(text, span.start)
+        if count is not None:
+            quantities[entity] = count
+        else:
+            quantities.setdefault(entity, 1)
 
     return quantities
 
-from rapidfuzz import fuzz
+def fuzzy_match_meal(query, threshold=80):
+    """
+    Best catalog meal for query (rapidfuzz partial_ratio over
+    mealName + searchKeywords), via the prebuilt matcher
+    """
+    with inference_timer("fuzzy_match_meal"):
+        return current_catalog().matcher.match(query, threshold)
+
 
-def fuzzy_match_meal(query, meals, threshold=80):
-    query = query.lower()
-    best = None
-    best_score = 0
+def find_meal_by_name(meal_name):
+    """
+    Resolve a meal by name from the in-memory catalog,
+    falling back to Firestore only on a miss
+    """
+    meal = current_catalog().get_by_name(meal_name)
+    if meal:
+        return meal
 
-    for meal in meals:
-        names = [meal["mealName"]] + meal.get("searchKeywords", [])
-        for name in names:
-            score = fuzz.partial_ratio(query, name.lower())
-            if score > best_score:
-                best_score = score
-                best = meal
+    docs = db.collection("meals") \
+        .where("mealName", "==", meal_name) \
+        .limit(1) \
+        .stream()
 
-    if best_score >= threshold:
-        return best, best_score / 100.0
+    for d in docs:
+        return d.to_dict()
 
-    return None, 0.0
+    return None
 
 
 def normalize_entity(entity):
@@ -103,21 +142,266 @@ cred = credentials.Certificate(firebase_key)
 firebase_admin.initialize_app(cred)
 
 db = firestore.client()
+metrics.instrument_firestore(db)
+
+# Independent reads of a request fan out on a small thread pool
+reads = ThreadedReads(db)
+
+# users/* and daily_targets/* reads go through a short TTL cache
+DOC_CACHE_TTL_SECONDS = float(os.environ.get("DOC_CACHE_TTL_SECONDS", 60))
+DOC_CACHE_MAX_ENTRIES = int(os.environ.get("DOC_CACHE_MAX_ENTRIES", 10000))
+
+doc_store = DataAccess(
+    reads,
+    ttl_seconds=DOC_CACHE_TTL_SECONDS,
+    max_entries=DOC_CACHE_MAX_ENTRIES,
+    cached_collections=("users", "daily_targets", "emails")
+)
 
+# Password hashing / checks run on a small process pool
+AUTH_PROCESSES = int(os.environ.get("AUTH_PROCESSES", 2))
+AUTH_MAX_PENDING = int(os.environ.get("AUTH_MAX_PENDING", 32))
 
+password_hasher = PasswordHasher(
+    processes=AUTH_PROCESSES,
+    max_pending=AUTH_MAX_PENDING
+)
 
-# Load meals once at startup
-meal_docs = db.collection("meals").stream()
-MEALS = [d.to_dict() for d in meal_docs]
 
+def email_index_path(email):
+    """
+    emails/{sha256 of the normalized email} -> {"userId"}, written
+    by /register so login is a document get instead of a users
+    query. Hashed: a raw email may contain "/" or be an invalid id.
+    """
+    normalized = str(email).strip().lower()
+    return f"emails/{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+# Upper bounds for multi-day /generate-meal-plan requests
+MAX_PLAN_DAYS = 14
+MAX_VARIETY_WINDOW = MAX_PLAN_DAYS
+
+# Upper bound for /tracker-summary?pageSize
+MAX_LOG_PAGE_SIZE = 200
+
+# Days of history considered by calorie banking
+CALORIE_BANKING_WINDOW_DAYS = int(os.environ.get("CALORIE_BANKING_WINDOW_DAYS", 3))
+
+
+
+# -------------------------------
+# Meal catalog (local snapshot first, Firestore in the background)
+# -------------------------------
+CATALOG_SNAPSHOT_PATH = os.environ.get("CATALOG_SNAPSHOT", "models/meal_catalog.pkl")
+# Shipped with the image: serves cold starts until the first snapshot exists
+CATALOG_SEED_PATH = os.environ.get("CATALOG_SEED", "meal_dataset.json")
+CATALOG_WAIT_SECONDS = 30
+
+# Follow meals edits live (on_snapshot) instead of a one-off check
+CATALOG_LIVE_RELOAD = os.environ.get("CATALOG_LIVE_RELOAD", "1") == "1"
+CATALOG_DEBOUNCE_SECONDS = float(os.environ.get("CATALOG_DEBOUNCE_SECONDS", 1.0))
 
+catalog_manager = CatalogManager(
+    db,
+    snapshot_path=CATALOG_SNAPSHOT_PATH,
+    seed_path=CATALOG_SEED_PATH,
+    live=CATALOG_LIVE_RELOAD,
+    debounce_seconds=CATALOG_DEBOUNCE_SECONDS
+)
 
 
 # -------------------------------
 # Load k-NN Smart Swap Model
 # -------------------------------
-knn_model = SmartSwapKNN()
-knn_model.load("models/knn_meal_swap.joblib")
+# Memory-mapped artifact directory, legacy joblib as a fallback
+KNN_ARTIFACT_PATH = "models/knn_meal_swap"
+KNN_LEGACY_PATH = "models/knn_meal_swap.joblib"
+
+KNN_FEATURE_FIELDS = ["calories", "protein", "carbs", "fat", "mealName"]
+
+knn_model = None
+
+# One rebuild at a time; requests keep using the previous model meanwhile
+knn_rebuilds = ThreadPoolExecutor(max_workers=1, thread_name_prefix="knn-rebuild")
+
+
+def rebuild_knn(catalog):
+    """
+    Refits the swap model on a newer catalog (same meal filter as
+    train_knn.py) and swaps it in
+    """
+    global knn_model
+
+    # Superseded by a later catalog while queued
+    if catalog is not catalog_manager.current:
+        return
+
+    try:
+        meals = [
+            m for m in catalog.meals
+            if all(k in m for k in KNN_FEATURE_FIELDS)
+        ]
+        model = SmartSwapKNN()
+        model.fit(meals)
+        knn_model = model
+        print(f"🔄 k-NN swap model rebuilt on {len(meals)} meals")
+    except Exception as e:
+        print(f"❌ k-NN rebuild failed: {e}")
+
+
+def load_knn(catalog):
+    """
+    Loads the swap model from disk with the first catalog (artifact
+    meal ids resolve against it); later catalogs refit it in the
+    background
+    """
+    global knn_model
+    if knn_model is not None:
+        knn_rebuilds.submit(rebuild_knn, catalog)
+        return
+
+    model = SmartSwapKNN()
+    if os.path.isdir(KNN_ARTIFACT_PATH):
+        model.load(KNN_ARTIFACT_PATH, lookup=catalog.get_by_name)
+    else:
+        model.load(KNN_LEGACY_PATH)
+    knn_model = model
+
+
+catalog_manager.on_swap(load_knn)
+catalog_manager.start()
+
+
+def current_catalog():
+    """
+    The live MealCatalog; 503 while the first load is in flight.
+    Pinned for the rest of the request, so a hot reload mid-request
+    can't mix two versions.
+    """
+    if "catalog" in g:
+        return g.catalog
+
+    catalog = catalog_manager.wait(CATALOG_WAIT_SECONDS)
+    if catalog is None:
+        raise ServiceUnavailable("Meal catalog is still loading")
+    g.catalog = catalog
+    return catalog
+
+
+def current_knn():
+    current_catalog()
+    if "knn" not in g:
+        g.knn = knn_model
+    return g.knn
+
+
+@app.errorhandler(ServiceUnavailable)
+def service_unavailable(e):
+    return jsonify({"error": e.description}), 503
+
+
+# -------------------------------
+# Request metrics (see metrics.py)
+# -------------------------------
+@app.before_request
+def start_request_metrics():
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.metrics_token = metrics.begin_request(route)
+    g.started_at = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        metrics.end_request(
+            token, request.method, response.status_code,
+            time.perf_counter() - g.started_at
+        )
+    return response
+
+
+# -------------------------------
+# Profiling + stage spans (see profiling.py)
+# -------------------------------
+# Admin endpoints and X-Profile requests are disabled without a token
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", 20))
+
+profiler = RequestProfiler(
+    capacity=PROFILE_BUFFER_SIZE,
+    sample_rate=PROFILE_SAMPLE_RATE
+)
+
+
+def is_admin():
+    # Compared as bytes: compare_digest rejects non-ASCII str
+    token = request.headers.get("X-Admin-Token")
+    if not ADMIN_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+@app.before_request
+def start_profiling():
+    g.spans_token = profiling.begin_spans()
+
+    requested = request.headers.get("X-Profile") == "1" and is_admin()
+    if profiler.should_profile(requested):
+        g.profile = profiler.start()
+        g.profile_started_at = time.perf_counter()
+
+
+@app.after_request
+def finish_profiling(response):
+    spans = {}
+    if "spans_token" in g:
+        spans = profiling.end_spans(g.pop("spans_token"))
+    if spans:
+        response.headers["Server-Timing"] = profiling.server_timing(spans)
+
+    profile = g.pop("profile", None)
+    if profile is not None:
+        record = profiler.finish(
+            profile,
+            request.url_rule.rule if request.url_rule else request.path,
+            request.method,
+            response.status_code,
+            (time.perf_counter() - g.profile_started_at) * 1000,
+            spans
+        )
+        response.headers["X-Profile-Id"] = str(record["id"])
+    return response
+
+
+# -------------------------------
+# ETags + compression (see payloads.py)
+# -------------------------------
+# Registered last so it runs first: metrics see the 304s
+@app.after_request
+def finalize_payload(response):
+    return payloads.finalize(request, response)
+
+
+# ======================================================
+# HEALTH: liveness vs readiness
+# ======================================================
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    ready = catalog_manager.is_ready() and knn_model is not None
+    return jsonify({
+        "ready": ready,
+        "catalog": catalog_manager.status(),
+        "knnLoaded": knn_model is not None,
+        "docCache": doc_store.stats()
+    }), 200 if ready else 503
 
 
 # ======================================================
@@ -143,7 +427,7 @@ def register_user():
         user_id = email.replace("@", "_").replace(".", "_")
 
     # 3. Hash password
-    password_hash = generate_password_hash(password)
+    password_hash = password_hasher.hash(password)
 
     user_profile = {
         "userId": user_id,
@@ -170,7 +454,12 @@ def register_user():
         "updated_at": firestore.SERVER_TIMESTAMP
     }
 
-    db.collection("users").document(user_id).set(user_profile)
+    # Profile + email index land together
+    batch = db.batch()
+    batch.set(db.collection("users").document(user_id), user_profile)
+    batch.set(db.document(email_index_path(email)), {"userId": user_id})
+    batch.commit()
+    doc_store.invalidate(f"users/{user_id}", email_index_path(email))
 
     return jsonify({
         "message": "User registered successfully",
@@ -189,19 +478,28 @@ def login_user():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
 
-    # 1. Find user by email
-    # querying the 'users' collection where field 'email' == email
-    users_ref = db.collection("users")
-    query = users_ref.where("email", "==", email).limit(1).stream()
-
+    # 1. Find user by email: emails/{email} index, then the profile
     user_doc = None
-    for doc in query:
-        user_doc = doc.to_dict()
-        break
-    
+    index_doc = doc_store.get(email_index_path(email))
+
+    if index_doc is not None and index_doc.exists:
+        profile_doc = doc_store.get(f"users/{index_doc.get('userId')}")
+        if profile_doc is not None and profile_doc.exists:
+            user_doc = profile_doc.to_dict()
+
+    # Accounts registered before the index: query once, then backfill
+    if user_doc is None:
+        users_ref = db.collection("users")
+        query = users_ref.where("email", "==", email).limit(1).stream()
+
+        for doc in query:
+            user_doc = doc.to_dict()
+            db.document(email_index_path(email)).set({"userId": doc.id})
+            break
+
     # 2. Verify user exists and password is correct
     if user_doc and "password_hash" in user_doc:
-        if check_password_hash(user_doc["password_hash"], password):
+        if password_hasher.verify(user_doc["password_hash"], password):
             # Success!
             # Remove sensitive data before returning
             user_doc.pop("password_hash", None)
@@ -223,14 +521,17 @@ def calculate_target():
     data = request.get_json(force=True)
     user_id = data.get("userId")
 
-    user_doc = db.collection("users").document(user_id).get()
-    if not user_doc.exists:
+    user_doc = doc_store.get(f"users/{user_id}")
+    if user_doc is None or not user_doc.exists:
         return jsonify({"error": "User not found"}), 404
 
     profile = user_doc.to_dict()
 
     base_targets = compute_base_targets(profile)
-    final_targets = apply_calorie_banking(user_id, base_targets, db)
+    final_targets = apply_calorie_banking(
+        user_id, base_targets, db,
+        window_days=CALORIE_BANKING_WINDOW_DAYS
+    )
 
     today = str(date.today())
 
@@ -243,6 +544,7 @@ def calculate_target():
         "generated_by": "ai",
         "created_at": firestore.SERVER_TIMESTAMP
     })
+    doc_store.invalidate(f"daily_targets/{user_id}_{today}")
 
     return jsonify(final_targets)
 
@@ -258,50 +560,69 @@ def generate_meal_plan():
     if not user_id:
         return jsonify({"error": "userId is required"}), 400
 
+    try:
+        days = int(data.get("days", 1))
+    except (TypeError, ValueError):
+        days = 0
+
+    if not 1 <= days <= MAX_PLAN_DAYS:
+        return jsonify({
+            "error": f"days must be between 1 and {MAX_PLAN_DAYS}"
+        }), 400
+
+    # Days a dish stays out of rotation in multi-day plans
+    try:
+        variety_window = int(data.get("varietyWindow", 3))
+    except (TypeError, ValueError):
+        variety_window = -1
+
+    if not 0 <= variety_window <= MAX_VARIETY_WINDOW:
+        return jsonify({
+            "error": f"varietyWindow must be between 0 and {MAX_VARIETY_WINDOW}"
+        }), 400
+
+    # Optional "seed" makes the plan reproducible
+    seed = data.get("seed")
+    if seed is not None and (
+        isinstance(seed, bool) or not isinstance(seed, int) or seed < 0
+    ):
+        return jsonify({"error": "seed must be a non-negative integer"}), 400
+
+    # Response shape: compact (default), full, or explicit fields
+    try:
+        fields = requested_fields(
+            data.get("view", request.args.get("view")),
+            data.get("fields", request.args.get("fields")),
+            COMPACT_MEAL_FIELDS
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # -------------------------------
-    # Fetch user profile
+    # Fetch user profile + today's target (cached, misses in one get_all)
     # -------------------------------
-    user_doc = db.collection("users").document(user_id).get()
-    if not user_doc.exists:
+    today = str(date.today())
+    (user_doc, target_doc), _ = doc_store.fetch(docs=[
+        f"users/{user_id}",
+        f"daily_targets/{user_id}_{today}"
+    ])
+
+    if user_doc is None or not user_doc.exists:
         return jsonify({"error": "User not found"}), 404
 
     user = user_doc.to_dict()
     restrictions = user.get("dietary_restrictions", {})
     health = user.get("health_conditions", {})
+    explanation = explanation_key(user)
 
     # -------------------------------
-    # Helper: fetch meals per type
+    # Fetch candidates (in-memory catalog, no Firestore queries)
     # -------------------------------
-    def fetch_meals(meal_type):
-        query = db.collection("meals").where(
-            "validMealTypes", "array_contains", meal_type
-        )
-
-        # Dietary restrictions
-        if restrictions.get("vegetarian"):
-            query = query.where("is_vegetarian", "==", True)
-        if restrictions.get("vegan"):
-            query = query.where("is_vegan", "==", True)
-        if restrictions.get("gluten_free"):
-            query = query.where("is_gluten_free", "==", True)
-        if restrictions.get("nut_allergy"):
-            query = query.where("is_nut_free", "==", True)
-
-        # Health conditions
-        if health.get("diabetes"):
-            query = query.where("glycemic_index", "in", ["Low", "Medium"])
-
-        meals = []
-        for doc in query.stream():
-            m = doc.to_dict()
-            m["source"] = "ai"   # 🔑 IMPORTANT FOR LOGGING
-            meals.append(m)
+    catalog = current_catalog()
 
-        return meals
+    def fetch_meals(meal_type):
+        return catalog.candidates(meal_type, restrictions, health)
 
-    # -------------------------------
-    # Fetch candidates
-    # -------------------------------
     breakfast_list = fetch_meals("Breakfast")
     lunch_list = fetch_meals("Lunch")
     dinner_list = fetch_meals("Dinner")
@@ -312,14 +633,9 @@ def generate_meal_plan():
             "error": "Not enough meals available for selected preferences"
         }), 400
     # -------------------------------
-    # Fetch user target calories
+    # User target calories
     # -------------------------------
-    today = str(date.today())
-    target_doc = db.collection("daily_targets").document(
-        f"{user_id}_{today}"
-    ).get()
-
-    if not target_doc.exists:
+    if target_doc is None or not target_doc.exists:
         return jsonify({"error": "Daily target not found"}), 400
 
     target = target_doc.to_dict()
@@ -337,9 +653,125 @@ def generate_meal_plan():
     # -------------------------------
     # Generate FULL meal plan (FIX)
     # -------------------------------
-    meal_plan = generate_full_meal_plan(target, meals_by_type)
+    if days == 1:
+        meal_plan = generate_full_meal_plan(
+            target, meals_by_type, seed=seed
+        )
+        return jsonify(project_plan(meal_plan, fields, explanation))
+
+    # -------------------------------
+    # Batch mode: N days, same pools, no dish repeated within the
+    # variety window, all plans stored in one batch write
+    # -------------------------------
+    plans = generate_multi_day_meal_plan(
+        target, meals_by_type, days,
+        variety_window=variety_window,
+        seed=seed
+    )
+
+    start = date.today()
+    batch = db.batch()
+    dated_plans = []
+
+    for i, plan in enumerate(plans):
+        plan_date = str(start + timedelta(days=i))
+        batch.set(
+            db.collection("meal_plans").document(f"{user_id}_{plan_date}"),
+            {
+                "userId": user_id,
+                "date": plan_date,
+                **plan,
+                "generated_by": "ai",
+                "created_at": firestore.SERVER_TIMESTAMP
+            }
+        )
+        dated_plans.append({
+            "date": plan_date, **project_plan(plan, fields, explanation)
+        })
+
+    batch.commit()
+
+    return jsonify({
+        "startDate": str(start),
+        "days": days,
+        "plans": dated_plans
+    })
+
+# ======================================================
+# DAILY AGGREGATE HELPERS (meal_logs + daily_consumption)
+# ======================================================
+@firestore.transactional
+def commit_logs_with_rollup(transaction, user_id, day, logs):
+    """
+    Adds new meal_logs and the day's consumption aggregate
+    in one transaction. Returns the new log ids.
+    """
+    base = None
+    if user_id and day:
+        base = read_rollup_base(db, user_id, day, transaction=transaction)
+
+    log_ids = []
+    for log in logs:
+        log_ref = db.collection("meal_logs").document()
+        transaction.set(log_ref, log)
+        log_ids.append(log_ref.id)
+
+    if user_id and day:
+        write_rollup(
+            db, user_id, day, macro_totals(logs),
+            log_delta=len(logs), base=base, writer=transaction
+        )
+
+    return log_ids
+
+
+@firestore.transactional
+def swap_logged_meal(transaction, log_ref, new_meal_name):
+    """
+    Rewrites a log to new_meal_name and moves the day's aggregate by
+    the macro difference, atomically. Returns (old_log, new_meal);
+    either is None when not found (nothing is written then).
+    """
+    log_doc = log_ref.get(transaction=transaction)
+    if not log_doc.exists:
+        return None, None
+
+    old_log = log_doc.to_dict()
+
+    new_meal = find_meal_by_name(new_meal_name)
+    if not new_meal:
+        return old_log, None
+
+    user_id = old_log.get("userId")
+    day = old_log.get("date")
+
+    base = None
+    if user_id and day:
+        base = read_rollup_base(db, user_id, day, transaction=transaction)
+
+    quantity = old_log.get("quantity", 1)
+
+    new_values = {
+        "mealName": new_meal["mealName"],
+        "mealType": new_meal.get("category"),
+        "calories": new_meal["calories"] * quantity,
+        "protein": new_meal["protein"] * quantity,
+        "carbs": new_meal["carbs"] * quantity,
+        "fat": new_meal["fat"] * quantity,
+        "source": "swap_ai",
+        "updated_at": firestore.SERVER_TIMESTAMP
+    }
+
+    transaction.update(log_ref, new_values)
+
+    if user_id and day:
+        write_rollup(
+            db, user_id, day, macro_delta(new_values, old_log),
+            base=base, writer=transaction
+        )
+
+    return old_log, new_meal
 
-    return jsonify(meal_plan)
 
 # ======================================================
 # 4. MEAL LOGGING API
@@ -348,6 +780,13 @@ def generate_meal_plan():
 def log_meal():
     data = request.get_json(force=True)
 
+    try:
+        macros = {m: parse_macro(data.get(m)) for m in MACROS}
+    except ValueError:
+        return jsonify({
+            "error": "calories, protein, carbs and fat must be numbers"
+        }), 400
+
     log_data = {
         "userId": data.get("userId"),
         "date": data.get("date"),  # YYYY-MM-DD
@@ -355,96 +794,151 @@ def log_meal():
         "mealName": data.get("mealName"),
         "mealType": data.get("mealType"),
 
-        "calories": data.get("calories"),
-        "protein": data.get("protein"),
-        "carbs": data.get("carbs"),
-        "fat": data.get("fat"),
+        **macros,
 
         "source": data.get("source", "manual"),  # manual | ai | nlp | knn_swap
         "timestamp": firestore.SERVER_TIMESTAMP
     }
 
-    db.collection("meal_logs").add(log_data)
+    # Log + daily aggregate commit together
+    commit_logs_with_rollup(
+        db.transaction(), log_data["userId"], log_data["date"], [log_data]
+    )
 
     return jsonify({"message": "Meal logged successfully"})
 
 # ======================================================
 # NLP MEAL LOGGING — ML BASED (PRODUCTION READY)
 # ======================================================
-@app.route("/log-meal-nlp-ml", methods=["POST"])
-def log_meal_nlp_ml():
-    data = request.get_json(force=True)
+# -------- CANONICAL COLLAPSE RULES --------
+CANONICAL_COLLAPSE = {
+    # DEFAULTS
+    "roti": "Plain Wheat Roti",
+    "dal": "Plain Dal",
+
+    # EXPLICIT VARIANTS
+    "jolada roti": "Plain Jowar Roti",
+    "jowar roti": "Plain Jowar Roti",
+    "ragi roti": "Plain Ragi Roti",
+    "bajra roti": "Plain Bajra Roti",
+
+    "kadala curry": "Plain Dal",
+    "chana dal": "Plain Dal",
+    "moong dal": "Plain Dal",
+    "dal tadka": "Plain Dal"
+}
 
-    user_id = data.get("userId")
-    date = data.get("date")
-    text = data.get("text")
 
-    if not all([user_id, date, text]):
-        return jsonify({"error": "Missing fields"}), 400
+def parse_meal_text(text, catalog):
+    """
+    STAGE 1: entities (normalized, in mention order) and their
+    quantities for one free-text entry
+    """
+    with profiling.span("extract"):
+        # One pass over the text with the catalog-wide extractor
+        spans = extract_food_entity_spans(text, catalog.extractor)
 
-    # -------- STAGE 1: ENTITY EXTRACTION --------
-    raw_entities = extract_food_entities(text)
+        # Normalize + safety filter
+        entities = list(dict.fromkeys(
+            e for e in (normalize_entity(span.entity) for span in spans)
+            if e is not None
+        ))
 
-    # Normalize + safety filter
-    entities = [
-        e for e in map(normalize_entity, raw_entities)
-        if e is not None
-    ]
+        return entities, extract_quantities(text, spans)
 
-    quantities = extract_quantities(text, entities)
 
-    logged = []
+# Classifier picks below this probability are not logged
+NLP_MODEL_MIN_CONFIDENCE = float(os.environ.get("NLP_MODEL_MIN_CONFIDENCE", 0.5))
 
-    # -------- CANONICAL COLLAPSE RULES --------
-    CANONICAL_COLLAPSE = {
-        # DEFAULTS
-        "roti": "Plain Wheat Roti",
-        "dal": "Plain Dal",
-
-        # EXPLICIT VARIANTS
-        "jolada roti": "Plain Jowar Roti",
-        "jowar roti": "Plain Jowar Roti",
-        "ragi roti": "Plain Ragi Roti",
-        "bajra roti": "Plain Bajra Roti",
-
-        "kadala curry": "Plain Dal",
-        "chana dal": "Plain Dal",
-        "moong dal": "Plain Dal",
-        "dal tadka": "Plain Dal"
-    }
 
-    for food in entities:
-        quantity = quantities.get(food, 1)
-        category = predict_category(food)
+def parse_with_model(texts):
+    """
+    STAGE 1 fallback for texts the rule-based extractor found
+    nothing in: the trained meal classifier (when its model file is
+    installed), one predict_proba call for all texts. Returns
+    (meal names, quantities, confidences) per text.
+    """
+    if not texts or not nlp_model.is_available():
+        return [([], {}, {}) for _ in texts]
 
-        # -------- STAGE 2: FUZZY MATCH (CONFIDENCE ONLY) --------
-        meal, score = fuzzy_match_meal(food, MEALS)
+    with profiling.span("classify_text"):
+        predictions_by_text = nlp_model.extract_meals_from_texts(texts)
 
-        if not meal:
-            print(f"❌ No match for '{food}'")
-            continue
+    parsed = []
+    for predictions in predictions_by_text:
+        entities, quantities, confidences = [], {}, {}
 
-        # -------- STAGE 3: FORCE CANONICAL DEFAULTS --------
-        if food in CANONICAL_COLLAPSE:
-            canonical_name = CANONICAL_COLLAPSE[food]
+        for p in predictions:
+            if p["confidence"] < NLP_MODEL_MIN_CONFIDENCE:
+                continue
+            if p["meal"] not in quantities:
+                entities.append(p["meal"])
+            quantities[p["meal"]] = p["quantity"]
+            confidences[p["meal"]] = p["confidence"]
+
+        parsed.append((entities, quantities, confidences))
+    return parsed
+
+
+def resolve_foods(foods, catalog, exact=()):
+    """
+    STAGES 2-3 for a set of entities, each distinct one resolved
+    once: {food: (meal or None, score, category)}. Categories come
+    from a single classifier call. Foods in exact are meal names
+    (classifier picks) and skip fuzzy matching.
+    """
+    foods = list(dict.fromkeys(foods))
+    with profiling.span("categorize"), inference_timer("predict_category"):
+        categories = predict_categories(foods)
+
+    resolved = {}
+    with profiling.span("match"):
+        for food, category in zip(foods, categories):
+            if food in exact:
+                meal = find_meal_by_name(food)
+                if not meal:
+                    print(f"❌ Classifier meal not in catalog: {food}")
+                resolved[food] = (meal, 1.0, category)
+                continue
 
-            docs = db.collection("meals") \
-                .where("mealName", "==", canonical_name) \
-                .limit(1) \
-                .stream()
+            # -------- STAGE 2: FUZZY MATCH (CONFIDENCE ONLY) --------
+            with inference_timer("fuzzy_match_meal"):
+                meal, score = catalog.matcher.match(food)
 
-            canonical_meal = None
-            for d in docs:
-                canonical_meal = d.to_dict()
+            if not meal:
+                print(f"❌ No match for '{food}'")
 
-            if canonical_meal:
-                meal = canonical_meal
-            else:
-                print(f"❌ Canonical meal not found: {canonical_name}")
-                continue
+            # -------- STAGE 3: FORCE CANONICAL DEFAULTS --------
+            elif food in CANONICAL_COLLAPSE:
+                canonical_name = CANONICAL_COLLAPSE[food]
+                meal = find_meal_by_name(canonical_name)
+
+                if not meal:
+                    print(f"❌ Canonical meal not found: {canonical_name}")
+
+            resolved[food] = (meal, score, category)
+    return resolved
+
+
+def build_nlp_logs(user_id, date, text, entities, quantities, resolved,
+                   confidences=None):
+    """
+    meal_logs documents and response items for one entry;
+    confidences overrides the match score (classifier picks)
+    """
+    pending_logs = []
+    logged = []
 
-        # -------- LOG TO FIRESTORE --------
-        db.collection("meal_logs").add({
+    for food in entities:
+        meal, score, category = resolved[food]
+        if not meal:
+            continue
+
+        score = (confidences or {}).get(food, score)
+
+        quantity = quantities.get(food, 1)
+
+        pending_logs.append({
             "userId": user_id,
             "date": date,
             "mealName": meal["mealName"],
@@ -467,12 +961,164 @@ def log_meal_nlp_ml():
             "confidence": round(score, 2)
         })
 
+    return pending_logs, logged
+
+
+@app.route("/log-meal-nlp-ml", methods=["POST"])
+def log_meal_nlp_ml():
+    data = request.get_json(force=True)
+
+    user_id = data.get("userId")
+    date = data.get("date")
+    text = data.get("text")
+
+    if not all([user_id, date, text]):
+        return jsonify({"error": "Missing fields"}), 400
+
+    catalog = current_catalog()
+
+    entities, quantities = parse_meal_text(text, catalog)
+
+    # Nothing the rules recognise: ask the meal classifier
+    confidences = {}
+    if not entities:
+        entities, quantities, confidences = parse_with_model([text])[0]
+
+    resolved = resolve_foods(entities, catalog, exact=confidences)
+    pending_logs, logged = build_nlp_logs(
+        user_id, date, text, entities, quantities, resolved, confidences
+    )
+
+    # -------- LOG TO FIRESTORE (all items + aggregate, one commit) --------
+    if pending_logs:
+        with profiling.span("commit"):
+            commit_logs_with_rollup(db.transaction(), user_id, date, pending_logs)
+
     return jsonify({
         "message": "Meal logged using multi-stage NLP",
         "items": logged
     })
 
 
+# ======================================================
+# BULK NLP MEAL LOGGING (offline sync)
+# ======================================================
+MAX_BULK_ENTRIES = 500
+
+# Firestore caps a commit at 500 writes; one is the day's aggregate
+MAX_LOGS_PER_COMMIT = 499
+
+
+def chunk_entries(entries, max_logs):
+    """
+    Groups (index, logs) pairs into commits of at most max_logs
+    logs without splitting an entry
+    """
+    chunk, size = [], 0
+    for entry in entries:
+        n = len(entry[1])
+        if chunk and size + n > max_logs:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(entry)
+        size += n
+    if chunk:
+        yield chunk
+
+
+@app.route("/log-meals-nlp-bulk", methods=["POST"])
+def log_meals_nlp_bulk():
+    """
+    Replays queued free-text entries in one request:
+    { "userId": ..., "entries": [ { "date": ..., "text": ... }, ... ] }
+
+    Extraction runs per entry, classification and matching once per
+    distinct food across the batch; logs are committed per day (with
+    that day's aggregate) in chunks of at most MAX_LOGS_PER_COMMIT
+    logs. A chunk never splits an entry, so every entry is either
+    saved or reported with an error; results come back in entry
+    order.
+    """
+    data = request.get_json(force=True)
+
+    user_id = data.get("userId")
+    entries = data.get("entries")
+
+    if not user_id or not isinstance(entries, list) or not entries:
+        return jsonify({"error": "userId and a non-empty entries list are required"}), 400
+
+    if len(entries) > MAX_BULK_ENTRIES:
+        return jsonify({"error": f"At most {MAX_BULK_ENTRIES} entries per request"}), 400
+
+    catalog = current_catalog()
+
+    # -------- STAGE 1: PARSE EVERY ENTRY --------
+    parsed = []
+    for entry in entries:
+        entry = entry if isinstance(entry, dict) else {}
+        if not all(
+            isinstance(entry.get(field), str) and entry[field]
+            for field in ("date", "text")
+        ):
+            parsed.append(None)
+            continue
+        parsed.append(parse_meal_text(entry["text"], catalog) + ({},))
+
+    # Entries the rules found nothing in: one classifier pass for all
+    misses = [i for i, p in enumerate(parsed) if p is not None and not p[0]]
+    for i, p in zip(misses, parse_with_model([entries[i]["text"] for i in misses])):
+        parsed[i] = p
+
+    # -------- STAGES 2-3: ONCE PER DISTINCT FOOD --------
+    resolved = resolve_foods(
+        [food for p in parsed if p for food in p[0]],
+        catalog,
+        exact={food for p in parsed if p for food in p[2]}
+    )
+
+    # -------- BUILD LOGS, GROUPED BY DAY --------
+    results = []
+    entries_by_day = {}   # day -> [(entry index, logs)]
+
+    for i, (entry, p) in enumerate(zip(entries, parsed)):
+        if p is None:
+            results.append({
+                "index": i, "error": "date and text must be non-empty strings", "items": []
+            })
+            continue
+
+        entities, quantities, confidences = p
+        pending_logs, logged = build_nlp_logs(
+            user_id, entry["date"], entry["text"], entities, quantities,
+            resolved, confidences
+        )
+
+        results.append({"index": i, "date": entry["date"], "items": logged})
+        if pending_logs:
+            entries_by_day.setdefault(entry["date"], []).append((i, pending_logs))
+
+    # -------- LOG TO FIRESTORE (per day, chunked by entry) --------
+    logged_count = 0
+    for day, day_entries in entries_by_day.items():
+        for chunk in chunk_entries(day_entries, MAX_LOGS_PER_COMMIT):
+            logs = [log for _, entry_logs in chunk for log in entry_logs]
+            try:
+                with profiling.span("commit"):
+                    commit_logs_with_rollup(db.transaction(), user_id, day, logs)
+                logged_count += len(logs)
+            except Exception as e:
+                # Earlier chunks are committed; only this one failed
+                print(f"❌ Bulk log commit failed for {day}: {e}")
+                for i, _ in chunk:
+                    results[i]["error"] = "Could not save logs"
+
+    return jsonify({
+        "message": "Meals logged using multi-stage NLP",
+        "logged": logged_count,
+        "results": results
+    })
+
+
 
 
 # ======================================================
@@ -485,8 +1131,8 @@ def get_user_profile():
     if not user_id:
         return jsonify({"error": "userId required"}), 400
 
-    doc = db.collection("users").document(user_id).get()
-    if not doc.exists:
+    doc = doc_store.get(f"users/{user_id}")
+    if doc is None or not doc.exists:
         return jsonify({"error": "User not found"}), 404
 
     return jsonify(doc.to_dict())
@@ -494,6 +1140,44 @@ def get_user_profile():
 #====================================================
 # Replace Meal API using k-NN Smart Swap 
 #====================================================
+def swap_filters(data):
+    """
+    (meal_type, restrictions, health, error_response) for a swap
+    request: body "restrictions" / "healthConditions" win, otherwise
+    the profile of "userId" is used. mealType must be one of the
+    catalog's meal types (k-NN partitions are cached per type).
+    """
+    meal_type = data.get("mealType")
+    restrictions = data.get("restrictions")
+    health = data.get("healthConditions")
+    user_id = data.get("userId")
+
+    meal_types = current_catalog().meal_types()
+    if meal_type is not None and meal_type not in meal_types:
+        return None, None, None, (jsonify({
+            "error": f"mealType must be one of {', '.join(meal_types)}"
+        }), 400)
+
+    for name, value in (("restrictions", restrictions), ("healthConditions", health)):
+        if value is not None and not isinstance(value, dict):
+            return None, None, None, (jsonify({
+                "error": f"{name} must be an object"
+            }), 400)
+
+    if user_id and (restrictions is None or health is None):
+        (user_doc,), _ = doc_store.fetch(docs=[f"users/{user_id}"])
+        if user_doc is None or not user_doc.exists:
+            return None, None, None, (jsonify({"error": "User not found"}), 404)
+
+        user = user_doc.to_dict()
+        if restrictions is None:
+            restrictions = user.get("dietary_restrictions", {})
+        if health is None:
+            health = user.get("health_conditions", {})
+
+    return meal_type, restrictions or {}, health or {}, None
+
+
 @app.route("/replace-meal", methods=["POST"])
 def replace_meal():
     data = request.get_json(force=True)
@@ -502,21 +1186,25 @@ def replace_meal():
     if not meal_name:
         return jsonify({"error": "mealName is required"}), 400
 
-    # 1️⃣ Fetch the original meal from Firestore
-    docs = db.collection("meals") \
-             .where("mealName", "==", meal_name) \
-             .limit(1) \
-             .stream()
-
-    original_meal = None
-    for d in docs:
-        original_meal = d.to_dict()
+    # 1️⃣ Resolve the original meal (catalog, Firestore on a miss)
+    original_meal = find_meal_by_name(meal_name)
 
     if not original_meal:
         return jsonify({"error": "Meal not found"}), 404
 
-    # 2️⃣ Find k-NN replacements
-    replacements = knn_model.find_replacements(original_meal, k=3)
+    # Swap filters: explicit restrictions, or the user's profile
+    meal_type, restrictions, health, error = swap_filters(data)
+    if error:
+        return error
+
+    # 2️⃣ Find k-NN replacements inside the user's partition
+    with inference_timer("find_replacements"):
+        replacements = current_knn().find_replacements(
+            original_meal, k=3,
+            meal_type=meal_type,
+            restrictions=restrictions,
+            health=health
+        )
 
     if not replacements:
         return jsonify({"error": "No replacement found"}), 404
@@ -528,6 +1216,64 @@ def replace_meal():
     })
 
 
+# Maximum meal names per /replace-meals request
+MAX_BATCH_SWAPS = 50
+
+
+@app.route("/replace-meals", methods=["POST"])
+def replace_meals():
+    """
+    Batch /replace-meal: every dish of a day in one request, one
+    vectorized k-NN call
+    """
+    data = request.get_json(force=True)
+    meal_names = data.get("mealNames")
+
+    if not meal_names or not isinstance(meal_names, list):
+        return jsonify({"error": "mealNames (list) is required"}), 400
+
+    if len(meal_names) > MAX_BATCH_SWAPS:
+        return jsonify({
+            "error": f"At most {MAX_BATCH_SWAPS} meals per request"
+        }), 400
+
+    meal_type, restrictions, health, error = swap_filters(data)
+    if error:
+        return error
+
+    # 1️⃣ Resolve all meals (catalog, Firestore on a miss)
+    resolved = [find_meal_by_name(name) for name in meal_names]
+    found = [meal for meal in resolved if meal]
+
+    # 2️⃣ One k-NN query for every resolved meal
+    with inference_timer("find_replacements_batch"):
+        suggestions = iter(current_knn().find_replacements_batch(
+            found, k=3,
+            meal_type=meal_type,
+            restrictions=restrictions,
+            health=health
+        ))
+
+    # 3️⃣ Per-input results, in request order
+    results = []
+    for name, meal in zip(meal_names, resolved):
+        if not meal:
+            results.append({"mealName": name, "error": "Meal not found"})
+            continue
+
+        replacements = next(suggestions)
+        if not replacements:
+            results.append({"mealName": name, "error": "No replacement found"})
+            continue
+
+        results.append({
+            "originalMeal": meal["mealName"],
+            "aiSuggestions": replacements
+        })
+
+    return jsonify({"results": results})
+
+
 # ======================================================
 # 6. TRACKER SUMMARY API
 # ======================================================
@@ -539,41 +1285,82 @@ def tracker_summary():
     if not user_id or not date:
         return jsonify({"error": "userId and date are required"}), 400
 
-    # -------------------------------
-    # Fetch meal logs for the day
-    # -------------------------------
-    logs_ref = db.collection("meal_logs") \
-        .where("userId", "==", user_id) \
-        .where("date", "==", date)
-
-    logs = []
-    total_cal = total_protein = total_carbs = total_fat = 0
-
-    for doc in logs_ref.stream():
-        log = doc.to_dict()
-        log["logId"] = doc.id   # 🔑 IMPORTANT
-        logs.append(log)
-
-        total_cal += log.get("calories", 0)
-        total_protein += log.get("protein", 0)
-        total_carbs += log.get("carbs", 0)
-        total_fat += log.get("fat", 0)
+    # Logs are optional (the "rings" view only needs totals) and pageable
+    include_logs = request.args.get("includeLogs", "true").lower() != "false"
+    page_size = None
+    if "pageSize" in request.args:
+        page_size = request.args.get("pageSize", type=int)
+        if page_size is None or not 1 <= page_size <= MAX_LOG_PAGE_SIZE:
+            return jsonify({
+                "error": f"pageSize must be between 1 and {MAX_LOG_PAGE_SIZE}"
+            }), 400
+
+    # The token is the last log id of the previous page
+    page_token = request.args.get("pageToken")
+    if page_token is not None and (
+        not page_size or "/" in page_token or page_token in (".", "..")
+        or not 0 < len(page_token.encode()) <= 1500
+    ):
+        return jsonify({"error": "Invalid pageToken"}), 400
+
+    try:
+        fields = requested_fields(
+            request.args.get("view"), request.args.get("fields"), COMPACT_LOG_FIELDS
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     # -------------------------------
-    # Fetch daily targets
+    # Fetch day aggregate + daily targets + logs (target cached, rest concurrently)
     # -------------------------------
-    target_doc = db.collection("daily_targets").document(
-        f"{user_id}_{date}"
-    ).get()
+    logs_filters = [("userId", "==", user_id), ("date", "==", date)]
+
+    if page_size:
+        logs_spec = QuerySpec(
+            "meal_logs", logs_filters,
+            order_by="__name__",
+            limit=page_size,
+            start_after={"__name__": page_token} if page_token else None
+        )
+    else:
+        logs_spec = QuerySpec("meal_logs", logs_filters)
+
+    (agg_doc, target_doc), log_pages = doc_store.fetch(
+        docs=[
+            f"{ROLLUP_COLLECTION}/{rollup_id(user_id, date)}",
+            f"daily_targets/{user_id}_{date}"
+        ],
+        queries=[logs_spec] if include_logs else []
+    )
 
     targets = {}
-    if target_doc.exists:
+    if target_doc is not None and target_doc.exists:
         targets = target_doc.to_dict()
 
+    def log_dict(doc):
+        log = doc.to_dict()
+        log["logId"] = doc.id   # 🔑 IMPORTANT
+        return log
+
+    logs = [log_dict(doc) for doc in log_pages[0]] if include_logs else []
+    next_page_token = None
+    if page_size and len(logs) == page_size:
+        next_page_token = logs[-1]["logId"]
+
+    if agg_doc is not None and agg_doc.exists:
+        consumed = macro_totals([agg_doc.to_dict()])
+    elif include_logs and not page_size:
+        consumed = macro_totals(logs)
+    else:
+        # No aggregate yet (day predates aggregates): sum the logs
+        consumed = macro_totals(
+            doc.to_dict() for doc in day_logs_query(db, user_id, date).stream()
+        )
+
     # -------------------------------
     # Final tracker response
     # -------------------------------
-    return jsonify({
+    response = {
         "date": date,
         "targets": {
             "calories": targets.get("calories", 0),
@@ -581,14 +1368,15 @@ def tracker_summary():
             "carbs": targets.get("carbs", 0),
             "fat": targets.get("fat", 0)
         },
-        "consumed": {
-            "calories": total_cal,
-            "protein": total_protein,
-            "carbs": total_carbs,
-            "fat": total_fat
-        },
-        "logs": logs
-    })
+        "consumed": consumed
+    }
+
+    if include_logs:
+        response["logs"] = [project(log, fields) for log in logs]
+        if page_size:
+            response["nextPageToken"] = next_page_token
+
+    return jsonify(response)
 
 
 # ======================================================
@@ -607,51 +1395,23 @@ def swap_meal():
         }), 400
 
     # -------------------------------
-    # 1️⃣ Fetch existing meal log
+    # 1️⃣ Fetch log, resolve new meal, update log + aggregate
     # -------------------------------
     log_ref = db.collection("meal_logs").document(meal_log_id)
-    log_doc = log_ref.get()
+    old_log, new_meal = swap_logged_meal(
+        db.transaction(), log_ref, new_meal_name
+    )
 
-    if not log_doc.exists:
+    if not old_log:
         return jsonify({
             "error": "Meal log not found"
         }), 404
 
-    old_log = log_doc.to_dict()
-
-    # -------------------------------
-    # 2️⃣ Fetch new meal from meals collection
-    # -------------------------------
-    meal_query = db.collection("meals") \
-        .where("mealName", "==", new_meal_name) \
-        .limit(1) \
-        .stream()
-
-    new_meal = None
-    for d in meal_query:
-        new_meal = d.to_dict()
-
     if not new_meal:
         return jsonify({
             "error": "New meal not found in meals database"
         }), 404
 
-    quantity = old_log.get("quantity", 1)
-
-    # -------------------------------
-    # 3️⃣ Update existing log (NO DELETE)
-    # -------------------------------
-    log_ref.update({
-        "mealName": new_meal["mealName"],
-        "mealType": new_meal.get("category"),
-        "calories": new_meal["calories"] * quantity,
-        "protein": new_meal["protein"] * quantity,
-        "carbs": new_meal["carbs"] * quantity,
-        "fat": new_meal["fat"] * quantity,
-        "source": "swap_ai",
-        "updated_at": firestore.SERVER_TIMESTAMP
-    })
-
     return jsonify({
         "message": "Meal swapped successfully",
         "oldMeal": old_log.get("mealName"),
@@ -661,12 +1421,64 @@ def swap_meal():
 
 
 
+# ======================================================
+# ADMIN: request profiles (X-Admin-Token)
+# ======================================================
+@app.route("/admin/profiles", methods=["GET"])
+def admin_profiles():
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+
+    return jsonify({
+        "sampleRate": profiler.sample_rate,
+        "profiles": profiler.list()
+    })
+
+
+@app.route("/admin/profiles/<int:profile_id>", methods=["GET"])
+def admin_profile(profile_id):
+    """
+    ?format=pstats downloads the raw dump (pstats.Stats(path))
+    """
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+
+    record = profiler.get(profile_id)
+    if record is None:
+        return jsonify({"error": "Profile not found"}), 404
+
+    if request.args.get("format") == "pstats":
+        return Response(
+            record["pstats"],
+            mimetype="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.pstats"}
+        )
+
+    return jsonify({k: v for k, v in record.items() if k != "pstats"})
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(
+        metrics.registry.render(),
+        mimetype="text/plain; version=0.0.4"
+    )
+
+
 @app.route("/routes", methods=["GET"])
 def routes():
     return jsonify([str(r) for r in app.url_map.iter_rules()])
 
+print(
+    f"🚀 Startup took {(time.perf_counter() - STARTUP_BEGAN) * 1000:.0f} ms "
+    f"(catalog {'ready' if catalog_manager.is_ready() else 'loading in background'})"
+)
+
 # RUN SERVER (LOCAL + CLOUD RUN SAFE)
 # ======================================================
 if __name__ == "__main__":
+    # Pool processes would re-import this script as their __main__
+    password_hasher.processes = 0
+
     port = int(os.environ.get("PORT", 8080))
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
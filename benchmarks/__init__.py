@@ -0,0 +1 @@
+# makes benchmarks a Python package (run modules with python -m)
@@ -0,0 +1,100 @@
+# benchmarks/bench_entity_extractor.py
+# Catalog entity extractor: speed plus a precision check on ordinary
+# English (nothing may be extracted), a recall check on meal text and
+# a check of the count read in front of a food
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_entity_extractor
+# Exits with status 1 when a check fails.
+
+import json
+import sys
+import time
+
+from ai.food_entity_extractor import FoodEntityExtractor, quantity_before
+
+# Sentences that are not about food; the catalog has brands and
+# keywords that collide with most of these words
+ORDINARY_TEXTS = [
+    "had a nice dinner with my family",
+    "stuck in a traffic jam for an hour",
+    "had a good day at work",
+    "played hide and seek with the kids",
+    "walked past the bakery on the way home",
+    "my boss is a treat to work with",
+    "the soda machine at the office is broken",
+    "watched the match over a beer commercial",
+    "a corn on my foot hurts",
+    "the kids have a sweet tooth",
+    "time to wrap up the meeting",
+    "my phone charger stopped working",
+    "skipped lunch because of meetings",
+    "going for a run in the evening",
+    "dark fantasy novels are my favourite",
+]
+
+# (text, entities that must be found)
+MEAL_TEXTS = [
+    ("2 rotis, dal and rice", {"roti", "dal", "rice"}),
+    ("had masala chai with 3 idli and sambar", {"masala chai"}),
+    ("jowar roti and chicken curry for lunch", {"jowar roti", "chicken curry"}),
+    ("curd rice with pickle", {"curd rice with pickle"}),
+    ("a samosa and a cup of tea", {"samosa", "chai"}),
+    ("2 rotis then good day butter cookies", {"roti", "good day butter cookies"}),
+]
+
+# (text, food, expected quantity or None)
+QUANTITY_TEXTS = [
+    ("2 rotis and dal", "rotis", 2),
+    ("1.5 rotis and dal", "rotis", 1.5),
+    ("2-3 rotis and dal", "rotis", None),
+    ("1/2 cup rice", "cup", None),
+    ("v2 rotis", "rotis", None),
+    ("rotis and dal", "rotis", None),
+]
+
+
+def main():
+    with open("meal_dataset.json", "r", encoding="utf-8") as f:
+        meals = json.load(f)
+
+    start = time.perf_counter()
+    extractor = FoodEntityExtractor(meals=meals)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    failures = 0
+    for text in ORDINARY_TEXTS:
+        found = extractor.extract(text)
+        if found:
+            failures += 1
+            print(f"❌ false positive in '{text}': {found}")
+
+    for text, expected in MEAL_TEXTS:
+        missing = expected - set(extractor.extract(text))
+        if missing:
+            failures += 1
+            print(f"❌ missed {sorted(missing)} in '{text}'")
+
+    for text, food, expected in QUANTITY_TEXTS:
+        found = quantity_before(text, text.index(food))
+        if found != expected:
+            failures += 1
+            print(f"❌ quantity {found!r} (expected {expected!r}) in '{text}'")
+
+    texts = ORDINARY_TEXTS + [t for t, _ in MEAL_TEXTS]
+    start = time.perf_counter()
+    for _ in range(200):
+        for text in texts:
+            extractor.extract(text)
+    per_text_us = (time.perf_counter() - start) / (200 * len(texts)) * 1e6
+
+    print("================================")
+    print(f"terms         : {extractor.size}")
+    print(f"build         : {build_ms:.1f} ms")
+    print(f"extract       : {per_text_us:.1f} µs/text")
+    print(f"failed checks : {failures}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,100 @@
+# benchmarks/bench_fuzzy_match.py
+# Linear fuzzy_match_meal scan vs prebuilt FuzzyMealMatcher
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_fuzzy_match
+
+import json
+import random
+import time
+
+from rapidfuzz import fuzz
+
+from ai.food_entity_extractor import FOOD_VOCAB
+from ai.fuzzy_matcher import FuzzyMealMatcher
+
+
+def linear_fuzzy_match(query, meals, threshold=80):
+    """
+    The original per-pair loop from app.py, kept as the reference
+    """
+    query = query.lower()
+    best = None
+    best_score = 0
+
+    for meal in meals:
+        names = [meal["mealName"]] + meal.get("searchKeywords", [])
+        for name in names:
+            score = fuzz.partial_ratio(query, name.lower())
+            if score > best_score:
+                best_score = score
+                best = meal
+
+    if best_score >= threshold:
+        return best, best_score / 100.0
+
+    return None, 0.0
+
+
+def build_queries(meals, n_catalog=200, seed=7):
+    rng = random.Random(seed)
+
+    queries = [v for variants in FOOD_VOCAB.values() for v in variants]
+
+    for meal in rng.sample(meals, min(n_catalog, len(meals))):
+        name = meal["mealName"].lower()
+        queries.append(name)
+
+        # single-character typo
+        if len(name) > 4:
+            i = rng.randrange(1, len(name) - 1)
+            queries.append(name[:i] + name[i + 1:])
+
+    queries += ["pizza", "xyz", "qq", "a", "paneer tikka masala with naan"]
+    return queries
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, time.perf_counter() - start
+
+
+def main():
+    with open("meal_dataset.json", "r", encoding="utf-8") as f:
+        meals = json.load(f)
+
+    start = time.perf_counter()
+    matcher = FuzzyMealMatcher(meals)
+    build_s = time.perf_counter() - start
+
+    queries = build_queries(meals)
+
+    print(f"Catalog: {len(meals)} meals, {len(matcher)} unique names")
+    print(f"Queries: {len(queries)}")
+    print(f"Matcher build: {build_s * 1000:.1f} ms")
+
+    old, old_s = timed(lambda q: linear_fuzzy_match(q, meals), queries)
+    new, new_s = timed(matcher.match, queries)
+
+    start = time.perf_counter()
+    batched = matcher.match_many(queries)
+    batch_s = time.perf_counter() - start
+
+    mismatches = 0
+    for q, a, b, c in zip(queries, old, new, batched):
+        for got in (b, c):
+            if a[0] is not got[0] or abs(a[1] - got[1]) > 1e-9:
+                mismatches += 1
+                print(f"❌ mismatch for '{q}': {a[0] and a[0]['mealName']} vs {got[0] and got[0]['mealName']}")
+
+    n = len(queries)
+    print("================================")
+    print(f"linear scan   : {old_s / n * 1e6:9.1f} µs/query")
+    print(f"matcher.match : {new_s / n * 1e6:9.1f} µs/query  ({old_s / new_s:.1f}x)")
+    print(f"match_many    : {batch_s / n * 1e6:9.1f} µs/query  ({old_s / batch_s:.1f}x)")
+    print(f"mismatches    : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_knn_swap.py
+# Live kneighbors vs precomputed neighbor table in SmartSwapKNN
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_knn_swap
+
+import time
+import warnings
+
+import numpy as np
+
+from ai.smart_swap_knn import SmartSwapKNN, feature_matrix
+
+MODEL_PATH = "models/knn_meal_swap.joblib"
+
+
+def per_call_us(fn, meals, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for meal in meals:
+            fn(meal)
+        best = min(best, time.perf_counter() - start)
+    return best / len(meals) * 1e6
+
+
+def main():
+    warnings.filterwarnings("ignore")
+
+    live = SmartSwapKNN(table_k=0)
+    live.load(MODEL_PATH)
+
+    start = time.perf_counter()
+    table = SmartSwapKNN()
+    table.load(MODEL_PATH)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    meals = table.meals
+    idx, dist = table.neighbor_table
+    print(f"Meals: {len(meals)}  table: {idx.shape} {idx.dtype}, "
+          f"{(idx.nbytes + dist.nbytes) / 1024:.1f} KB, load {load_ms:.1f} ms")
+
+    # Same neighbor distances either way (equal-distance ties may
+    # resolve to different meals)
+    def distances(model, meal):
+        found = model.find_replacements(meal, k=3)
+        X = model.scaler.transform(feature_matrix([meal] + found))
+        return np.round(np.linalg.norm(X[1:] - X[0], axis=1), 9)
+
+    same = sum(
+        np.array_equal(distances(live, meal), distances(table, meal))
+        for meal in meals
+    )
+    print(f"Identical neighbor distances: {same}/{len(meals)}")
+
+    off_catalog = [dict(m, calories=m["calories"] + 1) for m in meals[:100]]
+    filters = {"meal_type": "Lunch", "restrictions": {"vegetarian": True}}
+    members = [
+        m for m in meals
+        if m.get("is_vegetarian") is True and "Lunch" in m.get("validMealTypes", [])
+    ]
+
+    rows = [
+        ("global, catalog meal", meals, {}),
+        ("partition, catalog meal", members, filters),
+        ("global, off-catalog meal", off_catalog, {}),
+    ]
+
+    print("================================")
+    for name, sample, kwargs in rows:
+        before = per_call_us(lambda m: live.find_replacements(m, k=3, **kwargs), sample)
+        after = per_call_us(lambda m: table.find_replacements(m, k=3, **kwargs), sample)
+        print(f"{name:26s} live {before:8.1f} µs  table {after:8.1f} µs  ({before / after:.1f}x)")
+
+    start = time.perf_counter()
+    table.find_replacements_batch(meals, k=3)
+    batch_us = (time.perf_counter() - start) / len(meals) * 1e6
+    print(f"{'batch of all meals':26s} table {batch_us:8.1f} µs per meal")
+
+
+if __name__ == "__main__":
+    main()
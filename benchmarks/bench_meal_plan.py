@@ -0,0 +1,126 @@
+# benchmarks/bench_meal_plan.py
+# Random greedy fill (old build_meal) vs macro-aware optimizer
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_meal_plan
+
+import json
+import random
+import time
+
+import numpy as np
+
+from ai.meal_catalog import MealCatalog
+from ai.meal_plan_generator import (
+    MACRO_WEIGHTS, MEAL_SPLIT, NUTRIENT_COLS,
+    generate_full_meal_plan, slot_goal
+)
+
+
+def legacy_build_meal(meal_type, foods, daily_calories):
+    """
+    The original shuffle-and-fill generator, kept as the reference
+    """
+    target_calories = daily_calories * MEAL_SPLIT[meal_type]
+    meal_items = []
+    meal_calories = 0
+
+    random.shuffle(foods)
+
+    for food in foods:
+        if meal_calories >= target_calories * 0.90:
+            break
+
+        meal_items.append(food)
+        meal_calories += food.get("calories", 0)
+
+    return meal_items
+
+
+def legacy_plan(target, meals_by_type):
+    return {
+        meal_type: legacy_build_meal(meal_type, foods, target["calories"])
+        for meal_type, foods in meals_by_type.items() if foods
+    }
+
+
+def optimizer_plan(target, meals_by_type, seed):
+    plan = generate_full_meal_plan(target, meals_by_type, seed=seed)
+    return {
+        meal_type: plan[meal_type.lower()]["items"]
+        for meal_type, foods in meals_by_type.items() if foods
+    }
+
+
+def plan_error(plan, target):
+    """
+    Mean weighted relative deviation per slot, and mean absolute
+    calorie error (%) per slot
+    """
+    deviations, calorie_errors = [], []
+    for meal_type, items in plan.items():
+        goal = slot_goal(meal_type, target)
+        totals = np.array([sum(i.get(c) or 0 for i in items) for c in NUTRIENT_COLS])
+        rel = np.abs(totals - goal) / np.maximum(goal, 1.0)
+        deviations.append(float(rel @ MACRO_WEIGHTS))
+        calorie_errors.append(float(rel[0]) * 100)
+    return np.mean(deviations), np.mean(calorie_errors)
+
+
+def synthetic_targets(n, seed=11):
+    rng = random.Random(seed)
+    targets = []
+    for _ in range(n):
+        calories = rng.randrange(1400, 3000, 50)
+        targets.append({
+            "calories": calories,
+            "protein": round((0.25 * calories) / 4, 1),
+            "carbs": round((0.45 * calories) / 4, 1),
+            "fat": round((0.30 * calories) / 9, 1)
+        })
+    return targets
+
+
+def run(name, make_plan, targets, pools):
+    latencies, deviations, calorie_errors = [], [], []
+    for i, target in enumerate(targets):
+        meals_by_type = pools[i % len(pools)]
+        start = time.perf_counter()
+        plan = make_plan(target, meals_by_type, i)
+        latencies.append(time.perf_counter() - start)
+
+        dev, cal = plan_error(plan, target)
+        deviations.append(dev)
+        calorie_errors.append(cal)
+
+    lat = np.array(latencies) * 1000
+    print(
+        f"{name:10s} | deviation {np.mean(deviations):6.3f} (sd {np.std(deviations):5.3f})"
+        f" | calorie err {np.mean(calorie_errors):6.1f}%"
+        f" | latency p50 {np.percentile(lat, 50):6.2f} ms  p99 {np.percentile(lat, 99):6.2f} ms"
+    )
+
+
+def main(n_plans=200):
+    with open("meal_dataset.json", "r", encoding="utf-8") as f:
+        catalog = MealCatalog(json.load(f))
+
+    profiles = [
+        ({}, {}),
+        ({"vegetarian": True}, {}),
+        ({"vegan": True, "gluten_free": True}, {"diabetes": True}),
+    ]
+    pools = [
+        {t: catalog.candidates(t, r, h) for t in MEAL_SPLIT}
+        for r, h in profiles
+    ]
+
+    targets = synthetic_targets(n_plans)
+    print(f"Plans: {n_plans} ({len(profiles)} restriction profiles)")
+    print("================================")
+    run("legacy", lambda t, m, i: legacy_plan(t, {k: list(v) for k, v in m.items()}), targets, pools)
+    run("optimizer", optimizer_plan, targets, pools)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+# benchmarks/bench_suite.py
+# Latency / throughput of the ai/ package and every Flask route,
+# against the in-memory Firestore in benchmarks/fake_firestore.py
+# (no Firebase credentials needed)
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_suite                  # run, compare with baseline
+#   python -m benchmarks.bench_suite --save           # run, write the baseline
+#   python -m benchmarks.bench_suite --only ai        # one group (ai | routes)
+#   python -m benchmarks.bench_suite --baseline other.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+from werkzeug.security import generate_password_hash
+
+from ai.consumption_rollups import ROLLUP_COLLECTION, macro_totals, rollup_id
+from benchmarks.fake_firestore import FakeFirestore
+
+BASELINE_PATH = "benchmarks/baselines/suite.json"
+
+N_USERS = 50
+HISTORY_DAYS = 7
+LOGS_PER_DAY = 4
+
+# Slower than this vs the baseline p50 is flagged in the report
+REGRESSION_RATIO = 1.25
+
+# Enables the admin routes for the run
+ADMIN_TOKEN = "bench-admin-token"
+ADMIN = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+# -------------------------------
+# Measurement
+# -------------------------------
+def measure(fn, iterations, warmup=3):
+    """
+    Runs fn() iterations times (after warmup calls) and returns
+    ops/sec and latency percentiles in milliseconds
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+
+    samples *= 1000
+    return {
+        "n": iterations,
+        "ops_per_sec": round(iterations / (samples.sum() / 1000), 1),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p90_ms": round(float(np.percentile(samples, 90)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4)
+    }
+
+
+# -------------------------------
+# Fake Firestore + app
+# -------------------------------
+def synthetic_profile(rng, i):
+    return {
+        "userId": f"bench-user-{i:03d}",
+        "email": f"bench{i}@example.com",
+        "name": f"Bench {i}",
+        "age": rng.randint(18, 65),
+        "gender": rng.choice(["male", "female"]),
+        "height": rng.randint(150, 195),
+        "weight": rng.randint(50, 110),
+        "activity_level": rng.choice(["sedentary", "light", "moderately_active", "active"]),
+        "dietary_goal": rng.choice(["lose_weight", "maintain", "gain_weight"]),
+        "dietary_restrictions": {"vegetarian": rng.random() < 0.4},
+        "health_conditions": {"diabetes": rng.random() < 0.1},
+        "onboarding_completed": True
+    }
+
+
+def seed_fake(fake, meals, seed=11):
+    """
+    meal_dataset.json plus N_USERS synthetic users, with targets,
+    meal logs and daily aggregates for the last HISTORY_DAYS days
+    """
+    rng = random.Random(seed)
+    fake.seed("meals", meals)
+
+    # Every synthetic user logs in with password "pw"
+    password_hash = generate_password_hash("pw")
+
+    users, targets, logs, rollups = [], [], [], []
+    today = date.today()
+
+    for i in range(N_USERS):
+        profile = synthetic_profile(rng, i)
+        profile["password_hash"] = password_hash
+        users.append(profile)
+        user_id = profile["userId"]
+
+        for back in range(HISTORY_DAYS + 1):
+            day = str(today - timedelta(days=back))
+            targets.append({
+                "id": f"{user_id}_{day}", "userId": user_id, "date": day,
+                "calories": 2000, "protein": 125, "carbs": 225, "fat": 66.7
+            })
+
+            day_logs = []
+            for meal in rng.sample(meals, LOGS_PER_DAY):
+                day_logs.append({
+                    "userId": user_id, "date": day,
+                    "mealName": meal["mealName"], "mealType": meal.get("category"),
+                    "calories": meal["calories"], "protein": meal["protein"],
+                    "carbs": meal["carbs"], "fat": meal["fat"],
+                    "quantity": 1, "source": "manual"
+                })
+            logs.extend(day_logs)
+
+            # Leave the oldest day without an aggregate (legacy path)
+            if back < HISTORY_DAYS:
+                rollups.append({
+                    "id": rollup_id(user_id, day), "userId": user_id, "date": day,
+                    **macro_totals(day_logs), "logCount": len(day_logs)
+                })
+
+    fake.seed("users", users, id_field="userId")
+    fake.seed("daily_targets", targets, id_field="id")
+    fake.seed("meal_logs", logs)
+    fake.seed(ROLLUP_COLLECTION, rollups, id_field="id")
+    return users
+
+
+def load_app(fake):
+    """
+    Imports app.py with firebase_admin pointed at the fake client
+    """
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    credentials.Certificate = lambda *a, **k: object()
+    firebase_admin.initialize_app = lambda *a, **k: None
+    firestore.client = lambda *a, **k: fake
+
+    os.environ.setdefault("FIREBASE_SERVICE_ACCOUNT", "{}")
+    os.environ["CATALOG_LIVE_RELOAD"] = "0"
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    os.environ["CATALOG_SNAPSHOT"] = os.path.join(tempfile.mkdtemp(), "meal_catalog.pkl")
+
+    import app as app_module
+
+    if app_module.catalog_manager.wait(60) is None:
+        raise RuntimeError("Catalog did not load")
+    while app_module.knn_model is None:
+        time.sleep(0.05)
+    return app_module
+
+
+# -------------------------------
+# Benchmarks
+# -------------------------------
+def bench_ai(app_module, meals, users, fake):
+    from ai.food_entity_extractor import extract_food_entities
+    from ai.meal_plan_generator import build_meal
+    from ai.target_calculator import apply_calorie_banking, compute_base_targets
+
+    rng = random.Random(3)
+    catalog = app_module.catalog_manager.current
+    knn = app_module.knn_model
+
+    queries = ["roti", "dal", "chai", "curd rice", "paneer tikka", "biryani", "xyzzy"]
+    queries += [m["mealName"].lower() for m in rng.sample(meals, 50)]
+    texts = [
+        "2 rotis, dal and rice",
+        "had masala chai with 3 idli and sambar",
+        "jowar roti and chicken curry for lunch",
+        "nothing food related here at all"
+    ]
+
+    lunch = catalog.candidates("Lunch")
+    target = {"calories": 2000, "protein": 125, "carbs": 225, "fat": 66.7}
+    plan_rng = np.random.default_rng(5)
+
+    swap_meals = rng.sample(knn.meals, 100)
+    profile = users[0]
+    base_targets = compute_base_targets(profile)
+
+    cycle = {"q": 0, "t": 0, "m": 0}
+
+    def next_of(key, items):
+        cycle[key] = (cycle[key] + 1) % len(items)
+        return items[cycle[key]]
+
+    def fuzzy():
+        with app_module.app.test_request_context():
+            app_module.fuzzy_match_meal(next_of("q", queries))
+
+    results = {}
+    results["fuzzy_match_meal"] = measure(fuzzy, 500)
+    results["extract_food_entities"] = measure(
+        lambda: extract_food_entities(next_of("t", texts)), 5000
+    )
+    results["extract_food_entities[catalog]"] = measure(
+        lambda: extract_food_entities(next_of("t", texts), catalog.extractor), 5000
+    )
+    results["build_meal[Lunch]"] = measure(
+        lambda: build_meal("Lunch", lunch, target, rng=plan_rng), 100
+    )
+    results["SmartSwapKNN.find_replacements"] = measure(
+        lambda: knn.find_replacements(next_of("m", swap_meals), k=3), 2000
+    )
+    results["apply_calorie_banking"] = measure(
+        lambda: apply_calorie_banking(profile["userId"], base_targets, fake), 500
+    )
+    return results
+
+
+def route_cases(users, profile_id):
+    """
+    (name, method, url, payload factory, iterations[, options]) for
+    every route; options may set request "headers" and the expected
+    "status" (otherwise any status below 400)
+    """
+    today = str(date.today())
+    counter = {"n": 0}
+
+    def unique():
+        counter["n"] += 1
+        return counter["n"]
+
+    def user():
+        return users[unique() % len(users)]["userId"]
+
+    def register():
+        n = unique()
+        return {
+            "email": f"new{n}@example.com", "password": "pw",
+            "name": "New", "age": 30, "gender": "female",
+            "height": 165, "weight": 60, "activity_level": "light",
+            "dietary_goal": "maintain"
+        }
+
+    return [
+        ("GET /healthz", "GET", "/healthz", None, 500),
+        ("GET /readyz", "GET", "/readyz", None, 500),
+        ("GET /routes", "GET", "/routes", None, 500),
+        ("POST /register", "POST", "/register", register, 20),
+        ("POST /login", "POST", "/login",
+         lambda: {"email": "bench0@example.com", "password": "pw"}, 20),
+        ("POST /calculate-target", "POST", "/calculate-target",
+         lambda: {"userId": user()}, 200),
+        ("POST /generate-meal-plan", "POST", "/generate-meal-plan",
+         lambda: {"userId": user(), "seed": 1}, 30),
+        ("POST /generate-meal-plan[days=7]", "POST", "/generate-meal-plan",
+         lambda: {"userId": user(), "days": 7, "seed": 1}, 10),
+        ("POST /generate-meal-plan[view=full]", "POST", "/generate-meal-plan",
+         lambda: {"userId": user(), "seed": 1, "view": "full"}, 30),
+        ("POST /log-meal", "POST", "/log-meal",
+         lambda: {"userId": user(), "date": today, "mealName": "Plain Dal",
+                  "mealType": "Lunch", "calories": 150, "protein": 9,
+                  "carbs": 20, "fat": 4}, 200),
+        ("POST /log-meal-nlp-ml", "POST", "/log-meal-nlp-ml",
+         lambda: {"userId": user(), "date": today,
+                  "text": "2 rotis, dal and masala chai"}, 200),
+        ("POST /log-meals-nlp-bulk[50]", "POST", "/log-meals-nlp-bulk",
+         lambda: {"userId": user(), "entries": [
+             {"date": today, "text": "2 rotis and dal"},
+             {"date": today, "text": "curd rice with pickle"}
+         ] * 25}, 20),
+        ("GET /user-profile", "GET", lambda: f"/user-profile?userId={user()}", None, 500),
+        ("POST /replace-meal", "POST", "/replace-meal",
+         lambda: {"mealName": "Chicken Biryani", "userId": user(), "mealType": "Lunch"}, 200),
+        ("POST /replace-meals[10]", "POST", "/replace-meals",
+         lambda: {"mealNames": ["Plain Dal", "Masala Dosa", "Chicken Biryani",
+                                "Plain Rice", "Poha"] * 2}, 100),
+        ("GET /tracker-summary", "GET",
+         lambda: f"/tracker-summary?userId={user()}&date={today}", None, 300),
+        ("GET /tracker-summary[no logs]", "GET",
+         lambda: f"/tracker-summary?userId={user()}&date={today}&includeLogs=false", None, 300),
+        ("GET /metrics", "GET", "/metrics", None, 200),
+        ("GET /admin/profiles", "GET", "/admin/profiles", None, 500, {"headers": ADMIN}),
+        ("GET /admin/profiles[no token]", "GET", "/admin/profiles", None, 500, {"status": 404}),
+        ("GET /admin/profiles/<id>", "GET", f"/admin/profiles/{profile_id}", None, 200,
+         {"headers": ADMIN}),
+        ("GET /admin/profiles/<id>[pstats]", "GET",
+         f"/admin/profiles/{profile_id}?format=pstats", None, 200, {"headers": ADMIN}),
+        ("GET /admin/profiles/<id>[no token]", "GET", f"/admin/profiles/{profile_id}",
+         None, 500, {"status": 404}),
+    ]
+
+
+def bench_routes(app_module, users, fake):
+    client = app_module.app.test_client()
+    results = {}
+
+    # One profiled request for the /admin/profiles/<id> cases
+    profiled = client.get("/healthz", headers={**ADMIN, "X-Profile": "1"})
+    profile_id = profiled.headers["X-Profile-Id"]
+
+    for name, method, url, payload, iterations, *options in route_cases(users, profile_id):
+        options = options[0] if options else {}
+        headers = options.get("headers")
+        status = options.get("status")
+        failures = []
+
+        def call():
+            path = url() if callable(url) else url
+            body = payload() if payload else None
+            r = client.open(path, method=method, json=body, headers=headers)
+            ok = r.status_code == status if status else r.status_code < 400
+            if not ok:
+                failures.append(r.status_code)
+
+        results[name] = measure(call, iterations)
+        if failures:
+            results[name]["errors"] = len(failures)
+
+    # /swap-meal needs existing log ids
+    log_ids = [
+        d.id for d in fake.collection("meal_logs")
+        .where("date", "==", str(date.today())).limit(200).stream()
+    ]
+    swaps = iter(log_ids * 2)
+    results["POST /swap-meal"] = measure(
+        lambda: client.post("/swap-meal", json={"mealLogId": next(swaps), "newMeal": "plain rice"}),
+        min(len(log_ids), 200) - 3
+    )
+    return results
+
+
+# -------------------------------
+# Baselines
+# -------------------------------
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results
+        }, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def report(results, baseline=None):
+    base = (baseline or {}).get("results", {})
+    if baseline:
+        print(f"Baseline: commit {baseline.get('commit')}, python {baseline.get('python')}")
+
+    print("=" * 108)
+    print(f"{'benchmark':38s} {'ops/s':>10s} {'p50 ms':>10s} {'p90 ms':>10s} {'p99 ms':>10s}   vs baseline p50")
+    print("-" * 108)
+
+    for name, r in results.items():
+        line = (f"{name:38s} {r['ops_per_sec']:10.1f} {r['p50_ms']:10.3f} "
+                f"{r['p90_ms']:10.3f} {r['p99_ms']:10.3f}")
+
+        if name in base:
+            ratio = r["p50_ms"] / max(base[name]["p50_ms"], 1e-9)
+            flag = "  ⚠️ slower" if ratio > REGRESSION_RATIO else ""
+            line += f"   {ratio:5.2f}x{flag}"
+        if r.get("errors"):
+            line += f"   ❌ {r['errors']} errors"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--only", choices=["ai", "routes"])
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+
+    with open("meal_dataset.json", "r", encoding="utf-8") as f:
+        meals = json.load(f)
+
+    fake = FakeFirestore()
+    users = seed_fake(fake, meals)
+
+    # app.py prints on every unmatched food; keep the report readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        app_module = load_app(fake)
+
+        results = {}
+        if args.only in (None, "ai"):
+            results.update(bench_ai(app_module, meals, users, fake))
+        if args.only in (None, "routes"):
+            results.update(bench_routes(app_module, users, fake))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    report(results, load_baseline(args.baseline))
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"💾 Baseline saved to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+# benchmarks/fake_firestore.py
+# In-memory stand-in for the firestore.Client surface app.py uses,
+# so the suite runs without Firebase credentials.
+#
+# Covers collections / documents, where / order_by / limit /
+# start_after queries, get_all, write batches, transactions (enough
+# for @firestore.transactional), Increment / SERVER_TIMESTAMP /
+# ArrayUnion transforms and on_snapshot listeners. ops counts the
+# calls that would be Firestore round trips.
+
+import copy
+import threading
+import uuid
+
+from google.cloud.firestore_v1 import transforms
+
+
+class FakeSnapshot:
+    def __init__(self, ref, data):
+        self.reference = ref
+        self.id = ref.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+    def get(self, transaction=None, **_):
+        self._client.ops["get"] += 1
+        return FakeSnapshot(self, self._client._read(self.path))
+
+    def set(self, data, merge=False):
+        self._client.ops["write"] += 1
+        self._client._write(self.path, data, merge=merge)
+
+    def create(self, data):
+        if self._client._read(self.path) is not None:
+            raise AlreadyExists(self.path)
+        self.set(data)
+
+    def update(self, data):
+        self._client.ops["write"] += 1
+        if self._client._read(self.path) is None:
+            raise NotFound(self.path)
+        self._client._write(self.path, data, merge=True)
+
+    def delete(self):
+        self._client.ops["write"] += 1
+        self._client._delete(self.path)
+
+
+class NotFound(Exception):
+    pass
+
+
+class AlreadyExists(Exception):
+    pass
+
+
+def _field(data, path):
+    if path == "__name__":
+        return None
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    "array_contains_any": lambda a, b: isinstance(a, list) and any(x in a for x in b),
+}
+
+
+class FakeQuery:
+    def __init__(self, client, path, filters=(), orders=(), limit=None, start_after=None):
+        self._client = client
+        self._path = path
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._limit = limit
+        self._start_after = start_after
+
+    def _copy(self, **kw):
+        args = dict(filters=self._filters, orders=self._orders,
+                    limit=self._limit, start_after=self._start_after)
+        args.update(kw)
+        return FakeQuery(self._client, self._path, **args)
+
+    def where(self, field=None, op=None, value=None, filter=None):
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + [(field, direction)])
+
+    def limit(self, n):
+        return self._copy(limit=n)
+
+    def start_after(self, cursor):
+        return self._copy(start_after=cursor)
+
+    def _docs(self):
+        docs = self._client._children(self._path)
+        out = []
+        for doc_id, data in docs:
+            if all(_OPS[op](_field(data, f), v) for f, op, v in self._filters):
+                out.append((doc_id, data))
+        for field, direction in reversed(self._orders):
+            key = (lambda d: d[0]) if field == "__name__" else (lambda d, f=field: _field(d[1], f))
+            out.sort(key=key, reverse=direction == "DESCENDING")
+        if self._start_after:
+            name = self._start_after.get("__name__")
+            if name is not None:
+                if hasattr(name, "id"):
+                    name = name.id
+                out = [d for d in out if d[0] > name]
+        if self._limit is not None:
+            out = out[:self._limit]
+        return out
+
+    def stream(self, transaction=None, **_):
+        self._client.ops["query"] += 1
+        for doc_id, data in self._docs():
+            ref = FakeDocumentReference(self._client, f"{self._path}/{doc_id}")
+            yield FakeSnapshot(ref, copy.deepcopy(data))
+
+    def get(self, transaction=None, **_):
+        return list(self.stream())
+
+    def on_snapshot(self, callback):
+        return self._client._watch(self, callback)
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, doc_id=None):
+        doc_id = doc_id or uuid.uuid4().hex[:20]
+        return FakeDocumentReference(self._client, f"{self._path}/{doc_id}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, ref, data, merge=False):
+        self._writes.append(("set", ref, data, merge))
+
+    def update(self, ref, data):
+        self._writes.append(("update", ref, data, True))
+
+    def delete(self, ref):
+        self._writes.append(("delete", ref, None, False))
+
+    def create(self, ref, data):
+        self._writes.append(("create", ref, data, False))
+
+    def commit(self):
+        self._client.ops["commit"] += 1
+        with self._client._lock:
+            for kind, ref, data, merge in self._writes:
+                if kind == "create" and self._client._read(ref.path) is not None:
+                    raise AlreadyExists(ref.path)
+                if kind == "update" and self._client._read(ref.path) is None:
+                    raise NotFound(ref.path)
+            for kind, ref, data, merge in self._writes:
+                if kind == "delete":
+                    self._client._delete(ref.path)
+                else:
+                    self._client._write(ref.path, data, merge=merge)
+        self._writes = []
+        return []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    Enough of google.cloud.firestore Transaction for @transactional
+    """
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._id = None
+        self._max_attempts = 5
+        self._read_only = False
+
+    def _begin(self, retry_id=None):
+        self._id = b"fake-txn"
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self):
+        self.commit()
+        self._clean_up()
+        return []
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def get(self, ref_or_query):
+        if isinstance(ref_or_query, FakeDocumentReference):
+            return iter([ref_or_query.get()])
+        return ref_or_query.stream()
+
+    def get_all(self, refs):
+        return self._client.get_all(refs)
+
+
+class FakeFirestore:
+    """
+    In-memory stand-in for firestore.Client covering what app.py uses
+    """
+
+    def __init__(self):
+        self._docs = {}
+        self._lock = threading.RLock()
+        self._watches = []
+        self.ops = {"get": 0, "query": 0, "write": 0, "commit": 0, "get_all": 0}
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def document(self, path):
+        return FakeDocumentReference(self, path)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, **_):
+        return FakeTransaction(self)
+
+    def get_all(self, refs, transaction=None, **_):
+        self.ops["get_all"] += 1
+        for ref in refs:
+            yield FakeSnapshot(ref, self._read(ref.path))
+
+    # storage
+    def _read(self, path):
+        with self._lock:
+            data = self._docs.get(path)
+            return copy.deepcopy(data) if data is not None else None
+
+    def _children(self, coll_path):
+        prefix = coll_path + "/"
+        # Stored dicts are replaced on write, never mutated, so callers
+        # may read them without a copy (stream() copies what it yields)
+        with self._lock:
+            return [
+                (p[len(prefix):], d)
+                for p, d in self._docs.items()
+                if p.startswith(prefix) and "/" not in p[len(prefix):]
+            ]
+
+    def _apply(self, current, data):
+        out = dict(current or {})
+        for key, value in data.items():
+            if isinstance(value, transforms.Increment):
+                out[key] = (out.get(key) or 0) + value.value
+            elif value is transforms.SERVER_TIMESTAMP:
+                out[key] = "SERVER_TIMESTAMP"
+            elif isinstance(value, transforms.ArrayUnion):
+                out[key] = list(out.get(key) or []) + [v for v in value.values if v not in (out.get(key) or [])]
+            elif isinstance(value, transforms.ArrayRemove):
+                out[key] = [v for v in (out.get(key) or []) if v not in value.values]
+            elif value is transforms.DELETE_FIELD:
+                out.pop(key, None)
+            else:
+                out[key] = copy.deepcopy(value)
+        return out
+
+    def _write(self, path, data, merge=False):
+        with self._lock:
+            old = self._docs.get(path)
+            self._docs[path] = self._apply(old if merge else None, data)
+            self._notify(path, old, self._docs[path])
+
+    def _delete(self, path):
+        with self._lock:
+            old = self._docs.pop(path, None)
+            self._notify(path, old, None)
+
+    def _watch(self, query, callback):
+        self._watches.append((query, callback))
+        snaps = list(query.stream())
+        callback(snaps, [_Change("ADDED", s) for s in snaps], None)
+        return _Watch(self, (query, callback))
+
+    def _notify(self, path, old, new):
+        for query, callback in list(self._watches):
+            if path.rsplit("/", 1)[0] != query._path:
+                continue
+            ref = FakeDocumentReference(self, path)
+            if new is None:
+                kind = "REMOVED"
+            elif old is None:
+                kind = "ADDED"
+            else:
+                kind = "MODIFIED"
+            snap = FakeSnapshot(ref, copy.deepcopy(new) if new is not None else copy.deepcopy(old))
+            callback(list(query.stream()), [_Change(kind, snap)], None)
+
+    def seed(self, collection, docs, id_field=None):
+        """
+        Bulk-loads docs without notifying listeners; ids come from
+        id_field, or are "<collection>-00000", "<collection>-00001", ...
+        """
+        for i, doc in enumerate(docs):
+            doc_id = doc.get(id_field) if id_field else f"{collection}-{i:05d}"
+            self._docs[f"{collection}/{doc_id}"] = copy.deepcopy(doc)
+
+
+class _ChangeType:
+    def __init__(self, name):
+        self.name = name
+
+
+class _Change:
+    def __init__(self, kind, document):
+        self.type = _ChangeType(kind)
+        self.document = document
+
+
+class _Watch:
+    def __init__(self, client, entry):
+        self._client = client
+        self._entry = entry
+
+    def unsubscribe(self):
+        if self._entry in self._client._watches:
+            self._client._watches.remove(self._entry)
@@ -0,0 +1,128 @@
+# data_access.py
+# Cached document reads for request handlers
+#
+# User profiles change rarely and a day's targets about once a day,
+# so users/* and daily_targets/* snapshots are kept in a bounded
+# TTL / LRU cache in front of `reads` (firestore_reads.py). The
+# write paths (/register, /calculate-target) invalidate what they
+# touch; other workers see the change within the TTL.
+
+import threading
+import time
+from collections import OrderedDict
+
+CACHED_COLLECTIONS = ("users", "daily_targets")
+
+
+class TTLCache:
+    """
+    Bounded LRU map whose entries also expire ttl_seconds after
+    they were stored
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Cached value, or None on a miss / expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 3) if lookups else None
+            }
+
+
+class DataAccess:
+    """
+    Same fetch contract as ThreadedReads. Cached
+    documents are served from memory; everything else a request
+    needs (uncached documents, cache misses, queries) goes out in
+    a single reads.fetch, i.e. one get_all.
+    """
+
+    def __init__(self, reads, ttl_seconds=60, max_entries=10000,
+                 cached_collections=CACHED_COLLECTIONS):
+        self.reads = reads
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.cached_collections = tuple(cached_collections)
+
+    def _cacheable(self, path):
+        return path.split("/", 1)[0] in self.cached_collections
+
+    def fetch(self, docs=(), queries=()):
+        docs = list(docs)
+        snapshots = [None] * len(docs)
+
+        missing = []
+        for i, path in enumerate(docs):
+            snap = self.cache.get(path) if self._cacheable(path) else None
+            if snap is None:
+                missing.append(i)
+            else:
+                snapshots[i] = snap
+
+        if not missing and not queries:
+            return snapshots, []
+
+        fetched, results = self.reads.fetch(
+            docs=[docs[i] for i in missing], queries=queries
+        )
+
+        for i, snap in zip(missing, fetched):
+            snapshots[i] = snap
+
+            # Missing documents are not cached: they are about to be
+            # created (register / calculate-target), maybe elsewhere
+            if snap is not None and snap.exists and self._cacheable(docs[i]):
+                self.cache.put(docs[i], snap)
+
+        return snapshots, results
+
+    def get(self, path):
+        """
+        One document snapshot (None when the read returned nothing)
+        """
+        (snap,), _ = self.fetch(docs=[path])
+        return snap
+
+    def invalidate(self, *paths):
+        for path in paths:
+            self.cache.invalidate(path)
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,73 @@
+# firestore_reads.py
+# Concurrent Firestore reads for request handlers
+#
+# Handlers describe the documents / queries they need up front and
+# get them back in one call, with independent reads in flight at the
+# same time: one get_all for documents, queries on a small thread pool.
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QuerySpec:
+    """
+    Description of a collection query, built against a client
+    when it runs
+    """
+
+    def __init__(self, collection, filters=(), order_by=None,
+                 limit=None, start_after=None):
+        self.collection = collection
+        self.filters = list(filters)
+        self.order_by = order_by
+        self.limit = limit
+        self.start_after = start_after
+
+    def build(self, client):
+        query = client.collection(self.collection)
+        for field, op, value in self.filters:
+            query = query.where(field, op, value)
+        if self.order_by:
+            query = query.order_by(self.order_by)
+        if self.start_after:
+            query = query.start_after(self.start_after)
+        if self.limit:
+            query = query.limit(self.limit)
+        return query
+
+
+def _by_path(snapshots, paths):
+    found = {snap.reference.path: snap for snap in snapshots}
+    return [found.get(path) for path in paths]
+
+
+class ThreadedReads:
+    def __init__(self, db, max_workers=8):
+        self.db = db
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="firestore-read"
+        )
+
+    def _run_query(self, spec):
+        return list(spec.build(self.db).stream())
+
+    def fetch(self, docs=(), queries=()):
+        """
+        docs: document paths ("users/abc"), queries: QuerySpec list.
+        Returns (snapshots aligned with docs, result lists aligned
+        with queries).
+        """
+        # Pool threads run in the caller's context (request accounting)
+        futures = [
+            self.pool.submit(contextvars.copy_context().run, self._run_query, q)
+            for q in queries
+        ]
+
+        snapshots = []
+        if docs:
+            refs = [self.db.document(path) for path in docs]
+            snapshots = _by_path(self.db.get_all(refs), docs)
+
+        return snapshots, [f.result() for f in futures]
+
@@ -0,0 +1,330 @@
+# metrics.py
+# In-process metrics, exposed in Prometheus text format on /metrics
+#
+#   - per-route request latency
+#   - Firestore RPCs (count, latency, documents) per route, and per
+#     request by kind (read / query / write / transaction), counted by
+#     a proxy in front of the client's GAPIC API, so queries, get_all,
+#     batches and transactions are all seen
+#   - model inference latency
+#
+# Every observation is a bisect plus a few integer adds under a lock.
+# Values are per process (one set per gunicorn worker).
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+DOCUMENT_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+# RPC kinds (see FIRESTORE_RPCS) and the ones that move documents
+RPC_KINDS = ("read", "query", "write", "transaction")
+DOCUMENT_KINDS = ("read", "write")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# -------------------------------
+# Metric types
+# -------------------------------
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}   # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(
+                    f"{self.name}_bucket{_label_text(self.labels, label_values, le)} {cumulative}"
+                )
+            labels = _label_text(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_latency = registry.histogram(
+    "nutrilens_http_request_duration_seconds",
+    "Request latency by route",
+    labels=("route", "method", "status")
+)
+firestore_calls = registry.counter(
+    "nutrilens_firestore_calls_total",
+    "Firestore RPCs by route and RPC",
+    labels=("route", "rpc")
+)
+firestore_documents = registry.counter(
+    "nutrilens_firestore_documents_total",
+    "Documents requested by reads (get_all) and sent by writes (commit)",
+    labels=("route", "kind")
+)
+firestore_latency = registry.histogram(
+    "nutrilens_firestore_call_duration_seconds",
+    "Firestore RPC latency, streams included",
+    labels=("rpc",)
+)
+firestore_calls_per_request = registry.histogram(
+    "nutrilens_firestore_calls_per_request",
+    "Firestore RPCs made by one request, by kind (requests that made any)",
+    labels=("route", "kind"),
+    buckets=CALL_COUNT_BUCKETS
+)
+firestore_documents_per_request = registry.histogram(
+    "nutrilens_firestore_documents_per_request",
+    "Documents read / written by one request (requests that made any)",
+    labels=("route", "kind"),
+    buckets=DOCUMENT_COUNT_BUCKETS
+)
+firestore_seconds_per_request = registry.histogram(
+    "nutrilens_firestore_seconds_per_request",
+    "Time one request spent in Firestore RPCs, by kind (requests that made any)",
+    labels=("route", "kind")
+)
+inference_latency = registry.histogram(
+    "nutrilens_inference_duration_seconds",
+    "Model / matcher inference latency",
+    labels=("model",)
+)
+
+
+# -------------------------------
+# Per-request accounting
+# -------------------------------
+class RequestStats:
+    """
+    Firestore usage of one request; shared by the threads the
+    request fans out to
+    """
+
+    def __init__(self, route):
+        self.route = route
+        self.calls = dict.fromkeys(RPC_KINDS, 0)
+        self.documents = dict.fromkeys(DOCUMENT_KINDS, 0)
+        self.seconds = dict.fromkeys(RPC_KINDS, 0.0)
+        self._lock = threading.Lock()
+
+    def add(self, kind, documents, seconds):
+        with self._lock:
+            self.calls[kind] += 1
+            self.seconds[kind] += seconds
+            if kind in self.documents:
+                self.documents[kind] += documents
+
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def begin_request(route):
+    """
+    Starts accounting for the current request; returns a token
+    for end_request
+    """
+    stats = RequestStats(route)
+    return stats, _request_stats.set(stats)
+
+
+def end_request(token, method, status, seconds):
+    stats, var_token = token
+    _request_stats.reset(var_token)
+
+    http_latency.observe(seconds, stats.route, method, str(status))
+    # Only kinds the request used: most requests touch one or two
+    for kind, calls in stats.calls.items():
+        if not calls:
+            continue
+        firestore_calls_per_request.observe(calls, stats.route, kind)
+        firestore_seconds_per_request.observe(stats.seconds[kind], stats.route, kind)
+        if kind in stats.documents:
+            firestore_documents_per_request.observe(stats.documents[kind], stats.route, kind)
+    return stats
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+class inference_timer:
+    """
+    with inference_timer("fuzzy_match_meal"): ...
+    """
+
+    __slots__ = ("model", "start")
+
+    def __init__(self, model):
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        inference_latency.observe(time.perf_counter() - self.start, self.model)
+
+
+# -------------------------------
+# Firestore accounting proxy
+# -------------------------------
+# GAPIC method -> kind; anything else (listen, transport, ...) passes through
+FIRESTORE_RPCS = {
+    "batch_get_documents": "read",
+    "get_document": "read",
+    "list_documents": "read",
+    "run_query": "query",
+    "run_aggregation_query": "query",
+    "commit": "write",
+    "batch_write": "write",
+    "create_document": "write",
+    "update_document": "write",
+    "delete_document": "write",
+    "begin_transaction": "transaction",
+    "rollback": "transaction",
+}
+
+STREAMING_RPCS = {"batch_get_documents", "run_query", "run_aggregation_query"}
+
+
+def _document_count(rpc, request):
+    if request is None:
+        return 1
+    field = {"batch_get_documents": "documents", "commit": "writes", "batch_write": "writes"}.get(rpc)
+    if field is None:
+        return 1
+    items = request.get(field) if isinstance(request, dict) else getattr(request, field, None)
+    return len(items or ())
+
+
+def _record(rpc, kind, documents, seconds):
+    stats = _request_stats.get()
+    route = stats.route if stats is not None else "background"
+
+    firestore_calls.inc(1, route, rpc)
+    firestore_latency.observe(seconds, rpc)
+    if kind in ("read", "write"):
+        firestore_documents.inc(documents, route, kind)
+    if stats is not None:
+        stats.add(kind, documents, seconds)
+
+
+class _AccountedFirestoreAPI:
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        kind = FIRESTORE_RPCS.get(name)
+        if kind is None or not callable(attr):
+            return attr
+        return self._wrap(name, kind, attr)
+
+    def _wrap(self, rpc, kind, method):
+        def call(*args, **kwargs):
+            documents = _document_count(rpc, kwargs.get("request"))
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+
+            if rpc not in STREAMING_RPCS:
+                _record(rpc, kind, documents, time.perf_counter() - start)
+                return result
+
+            def stream():
+                try:
+                    yield from result
+                finally:
+                    _record(rpc, kind, documents, time.perf_counter() - start)
+            return stream()
+        return call
+
+
+def instrument_firestore(client):
+    """
+    Routes a firestore Client's RPCs through the accounting proxy.
+    Returns False for clients without a GAPIC layer (e.g. the
+    benchmark fake).
+    """
+    if not hasattr(client, "_firestore_api_internal"):
+        return False
+
+    api = client._firestore_api
+    if not isinstance(api, _AccountedFirestoreAPI):
+        client._firestore_api_internal = _AccountedFirestoreAPI(api)
+    return True
@@ -0,0 +1,70 @@
+# password_hashing.py
+# Password hashing / verification off the request thread
+#
+# werkzeug's hashes are pure CPU for tens of milliseconds. They run
+# on a small process pool so a burst of logins can't hold the GIL
+# against the I/O-bound endpoints; at most max_pending calls wait
+# for the pool, beyond that callers get ServiceUnavailable.
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def _mp_context():
+    # Pool processes come from a clean fork server, not from the
+    # threaded (gRPC, listeners) request process
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["werkzeug.security"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class PasswordHasher:
+    """
+    processes=0 hashes inline on the calling thread
+    """
+
+    def __init__(self, processes=2, max_pending=32, wait_seconds=10):
+        self.processes = processes
+        self.wait_seconds = wait_seconds
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _get_pool(self):
+        # Started on first use, so importing the app spawns nothing
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=_mp_context()
+                    )
+        return self._pool
+
+    def _run(self, fn, *args):
+        if not self.processes:
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            raise ServiceUnavailable("Too many concurrent sign-ins, retry shortly")
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,160 @@
+# payloads.py
+# Response size: field projections, compression and ETags
+#
+#   - meal plans and tracker logs default to a "compact" view (ids,
+#     names, macros and, for meals, the one explanation that fits the
+#     user), "full" returns the stored documents, "fields" picks keys
+#   - responses are gzip (or brotli, when installed) compressed for
+#     clients that accept it
+#   - GET responses carry a weak ETag; a matching If-None-Match
+#     gets an empty 304
+
+import gzip
+
+from werkzeug.http import generate_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Meals have no id of their own; mealName is what every other
+# endpoint (swap, log, replace) keys them by. "source" is sent back
+# by clients that log a plan meal (/log-meal).
+COMPACT_MEAL_FIELDS = (
+    "mealName", "category", "servingSize", "source",
+    "calories", "protein", "carbs", "fat", "explanation"
+)
+COMPACT_LOG_FIELDS = (
+    "logId", "date", "mealName", "mealType", "quantity",
+    "calories", "protein", "carbs", "fat"
+)
+VIEWS = ("compact", "full")
+
+# dietary_goal -> key of a meal's "explanations"
+GOAL_EXPLANATIONS = {
+    "lose_weight": "weight_loss",
+    "gain_weight": "muscle_gain"
+}
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 512
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/plain", "text/html")
+
+
+# -------------------------------
+# Projections
+# -------------------------------
+def requested_fields(view=None, fields=None, compact=()):
+    """
+    Keys to keep per item, or None for the full documents.
+    fields ("a,b" or a list of strings) wins over view; raises
+    ValueError on any other fields value or view.
+    """
+    if fields is not None:
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+            raise ValueError("fields must be a comma-separated string or a list of strings")
+        fields = tuple(f.strip() for f in fields if f.strip())
+        if fields:
+            return fields
+
+    view = "compact" if view in (None, "") else view
+    if not isinstance(view, str) or view.lower() not in VIEWS:
+        raise ValueError(f"view must be one of {', '.join(VIEWS)}")
+    return None if view.lower() == "full" else tuple(compact)
+
+
+def explanation_key(user):
+    """
+    Which explanation a user should see: a health condition
+    first, then the dietary goal
+    """
+    health = user.get("health_conditions") or {}
+    if health.get("diabetes"):
+        return "diabetes"
+    if health.get("fever"):
+        return "fever"
+    return GOAL_EXPLANATIONS.get(user.get("dietary_goal"), "default")
+
+
+def project(item, fields, explanation="default"):
+    """
+    item restricted to fields; "explanation" is the item's
+    explanations[explanation] (falling back to "default")
+    """
+    if fields is None:
+        return item
+
+    projected = {f: item[f] for f in fields if f in item}
+    if "explanation" in fields and "explanation" not in item:
+        explanations = item.get("explanations") or {}
+        text = explanations.get(explanation) or explanations.get("default")
+        if text is not None:
+            projected["explanation"] = text
+    return projected
+
+
+def project_plan(plan, fields, explanation="default"):
+    """
+    A generate_full_meal_plan day with its meal items projected
+    """
+    if fields is None:
+        return plan
+
+    return {
+        key: {**slot, "items": [project(m, fields, explanation) for m in slot["items"]]}
+        if isinstance(slot, dict) and "items" in slot else slot
+        for key, slot in plan.items()
+    }
+
+
+# -------------------------------
+# Compression + ETags
+# -------------------------------
+def _encoding(request):
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def finalize(request, response):
+    """
+    Adds an ETag / answers 304 for GETs, then compresses the body.
+    Streamed, already-encoded and error responses pass through, and
+    the cheap checks come first: most bodies are small.
+    """
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+
+    body = response.get_data()
+
+    # The tag describes the uncompressed representation, hence weak.
+    # Only a request carrying If-None-Match can get a 304.
+    if request.method == "GET":
+        response.set_etag(generate_etag(body), weak=True)
+        if "If-None-Match" in request.headers:
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+    if len(body) < MIN_COMPRESS_BYTES or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    encoding = _encoding(request)
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=5))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=6, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,149 @@
+# profiling.py
+# Opt-in request profiling and per-stage spans
+#
+# A request is profiled with cProfile when it asks for it (header,
+# admin token required) or is picked by the sampling rate. Results
+# go into a bounded in-memory ring buffer that the admin endpoints
+# read. Spans are cheap wall-clock timings of named stages, recorded
+# for every request and returned in a Server-Timing header.
+
+import contextvars
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# Lines of the cumulative-time table kept per profile
+SUMMARY_LINES = 40
+
+
+# -------------------------------
+# Spans
+# -------------------------------
+_spans = contextvars.ContextVar("spans", default=None)
+
+
+def begin_spans():
+    return _spans.set({})
+
+
+def end_spans(token):
+    """
+    {stage: milliseconds} recorded since begin_spans, in order
+    """
+    spans = _spans.get()
+    _spans.reset(token)
+    return spans or {}
+
+
+class span:
+    """
+    with span("extract"): ...   (repeated stages add up)
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = _spans.get()
+        if spans is not None:
+            elapsed = (time.perf_counter() - self.start) * 1000
+            spans[self.name] = spans.get(self.name, 0.0) + elapsed
+
+
+def server_timing(spans):
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in spans.items())
+
+
+# -------------------------------
+# Profiles
+# -------------------------------
+class RequestProfiler:
+    """
+    Ring buffer of the last `capacity` request profiles. Only one
+    request is profiled at a time (cProfile is process-wide on newer
+    Pythons); others are skipped while it runs.
+    """
+
+    def __init__(self, capacity=20, sample_rate=0.0):
+        self.sample_rate = sample_rate
+        self.profiles = deque(maxlen=capacity)
+
+        self._ids = itertools.count(1)
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def should_profile(self, requested):
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self):
+        """
+        A running cProfile.Profile, or None if another request holds
+        the profiler
+        """
+        if not self._active.acquire(blocking=False):
+            return None
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiling tool is active
+            self._active.release()
+            return None
+        return profile
+
+    def finish(self, profile, route, method, status, duration_ms, spans):
+        profile.disable()
+        self._active.release()
+
+        profile.create_stats()
+        # Dumped first: pstats.Stats takes the profile's stats and
+        # leaves it empty
+        dump = marshal.dumps(profile.stats)
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary) \
+            .sort_stats("cumulative") \
+            .print_stats(SUMMARY_LINES)
+
+        record = {
+            "id": next(self._ids),
+            "route": route,
+            "method": method,
+            "status": status,
+            "durationMs": round(duration_ms, 2),
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "spans": {name: round(ms, 3) for name, ms in spans.items()},
+            "summary": summary.getvalue(),
+            "pstats": dump
+        }
+
+        with self._lock:
+            self.profiles.append(record)
+        return record
+
+    def list(self):
+        with self._lock:
+            return [
+                {k: v for k, v in p.items() if k not in ("summary", "pstats")}
+                for p in reversed(self.profiles)
+            ]
+
+    def get(self, profile_id):
+        with self._lock:
+            for p in self.profiles:
+                if p["id"] == profile_id:
+                    return p
+        return None
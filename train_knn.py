@@ -37,10 +37,13 @@ if len(meals) < 10:
 model = SmartSwapKNN()
 model.fit(meals)
 
+table_idx, _ = model.neighbor_table
+print(f"✅ Precomputed neighbor table: {table_idx.shape[0]} meals x {table_idx.shape[1]} neighbors")
+
 # ---------------------------------
 # Save Model
 # ---------------------------------
 os.makedirs("models", exist_ok=True)
-model.save("models/knn_meal_swap.joblib")
+model.save("models/knn_meal_swap")
 
 print("✅ KNN model retrained and saved successfully")